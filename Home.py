@@ -8,6 +8,8 @@ Run: streamlit run Home.py
 import streamlit as st
 from dotenv import load_dotenv
 
+from page_styles import inline_styles
+
 load_dotenv()
 
 # Page configuration
@@ -19,96 +21,7 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Newsreader:ital,wght@0,300;0,400;0,500;1,300;1,400&family=DM+Sans:wght@300;400;500;600&display=swap');
-
-    /* Global */
-    .stApp {
-        background-color: #08080c;
-        color: #d8d4ce;
-    }
-
-    /* Hide streamlit chrome */
-    #MainMenu, footer, header { visibility: hidden; }
-    .block-container { padding-top: 3rem; padding-bottom: 3rem; max-width: 900px; }
-
-    /* Typography */
-    h1, h2, h3 {
-        font-family: 'Newsreader', Georgia, serif !important;
-        color: #ece8e0 !important;
-        font-weight: 300 !important;
-    }
-
-    p, li, span, div {
-        font-family: 'DM Sans', sans-serif;
-    }
-
-    /* App cards */
-    .app-card {
-        background: linear-gradient(135deg, rgba(138,104,64,0.08), rgba(106,80,48,0.05));
-        border: 1px solid #2a2520;
-        border-left: 4px solid #8a6840;
-        border-radius: 16px;
-        padding: 2rem;
-        margin: 1.5rem 0;
-        transition: all 0.3s;
-    }
-
-    .app-card:hover {
-        border-left-width: 6px;
-        background: linear-gradient(135deg, rgba(138,104,64,0.12), rgba(106,80,48,0.08));
-        transform: translateX(4px);
-    }
-
-    .app-icon {
-        font-size: 2.5rem;
-        margin-bottom: 0.5rem;
-    }
-
-    .app-title {
-        font-family: 'Newsreader', Georgia, serif;
-        font-size: 1.8rem;
-        color: #c9b8a0;
-        margin-bottom: 0.5rem;
-        font-weight: 400;
-    }
-
-    .app-subtitle {
-        font-family: 'DM Sans', sans-serif;
-        font-size: 0.9rem;
-        color: #7a7570;
-        font-style: italic;
-        margin-bottom: 1rem;
-    }
-
-    .app-description {
-        font-family: 'DM Sans', sans-serif;
-        font-size: 0.95rem;
-        line-height: 1.7;
-        color: #a8a098;
-    }
-
-    .feature-list {
-        margin-top: 1rem;
-        padding-left: 0;
-        list-style: none;
-    }
-
-    .feature-list li {
-        padding: 0.3rem 0;
-        color: #8a7a6a;
-        font-size: 0.85rem;
-    }
-
-    .feature-list li:before {
-        content: "◦ ";
-        color: #8a6840;
-        font-weight: bold;
-        margin-right: 0.5rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(inline_styles("home.css"), unsafe_allow_html=True)
 
 # Header
 st.markdown("""
@@ -0,0 +1,517 @@
+"""
+Shared call policy for the LLM call sites: latency budgets, retries, hedging
+and a circuit breaker.
+
+Each call site has a CallPolicy with a total latency budget. Every attempt
+gets the remaining budget as its request timeout. 429, 5xx and connection
+errors are retried with full-jitter exponential backoff (honouring
+retry-after) while the budget lasts. Where hedging is on, a second identical
+request is sent once the first has run past the site's observed p95 latency,
+and whichever finishes first wins. Hedged attempts run on a pool with a
+worker for every request the rate limiter can admit at once; when every
+worker is busy, the call runs unhedged on the caller's thread rather than
+queueing, so time spent waiting for a worker never fires a hedge. Latency is sampled separately per call
+kind (blocking calls, async calls, time to first streamed event), and only
+blocking-call samples drive hedging.
+
+All sites share one CircuitBreaker, because they share one upstream. After
+BREAKER_FAILURES consecutive transient failures it opens, and calls fail fast
+with CircuitOpenError (or go straight to the caller's fallback) until
+BREAKER_RESET_SECONDS have passed. A single trial call then decides whether
+it closes again; a trial that never reaches the API (the rate limiter turned
+it away) reopens the breaker, and a trial that has not reported back within
+BREAKER_RESET_SECONDS is replaced by a new one.
+
+Every upstream request is first admitted by the process-wide rate limiter
+(see rate_limit), which may queue it for up to the remaining budget.
+
+Each policy also records the token usage of its calls, including prompt-cache
+reads and writes, so the effect of cache_control on cost and time to first
+token can be checked in stats() and recent_calls.
+
+Run `python call_policy.py` to exercise the policy against fake_anthropic
+with injected failures and latency.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import anthropic
+
+from rate_limit import REQUESTS_PER_MINUTE, QueueTimeout, get_limiter
+
+BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", 5))
+BREAKER_RESET_SECONDS = float(os.environ.get("LLM_BREAKER_RESET", 30))
+MAX_RETRY_AFTER = 10.0
+LATENCY_KINDS = ("call", "acall", "first_event")
+
+# The limiter's request bucket holds REQUESTS_PER_MINUTE, so that is the most requests that can be in flight at once
+HEDGE_WORKERS = int(os.environ.get("LLM_HEDGE_WORKERS", REQUESTS_PER_MINUTE))
+
+_hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+# One per worker, held from submit until the request returns, so a submitted request never waits for a worker
+_hedge_slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the API while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial."""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Whether a call may go upstream now. In half-open state only the trial
+        call may, or a new one once the last has gone reset_seconds without
+        an outcome.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.reset_seconds or \
+                    self.state == "half_open" and now - self._trial_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._trial_at = now
+                return True
+            return False
+
+    def release_trial(self):
+        """The half-open trial ended without reaching the API: open again, to retry after reset_seconds."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+def is_retryable(exc):
+    """Rate limits, server errors, timeouts and dropped connections."""
+    if isinstance(exc, anthropic.APIConnectionError):
+        return True
+    return isinstance(exc, anthropic.APIStatusError) and (exc.status_code in (408, 409, 429) or exc.status_code >= 500)
+
+
+def is_unavailable(exc):
+    """True when a call failed because the API is degraded rather than because the request was bad."""
+    return isinstance(exc, (CircuitOpenError, QueueTimeout)) or is_retryable(exc)
+
+
+def token_usage(usage):
+    """Token counts from a response's usage block, cache reads and writes included; None without one."""
+    if usage is None:
+        return None
+    return {
+        "input": usage.input_tokens or 0,
+        "output": usage.output_tokens or 0,
+        "cache_read": getattr(usage, "cache_read_input_tokens", None) or 0,
+        "cache_write": getattr(usage, "cache_creation_input_tokens", None) or 0,
+    }
+
+
+def _billed_tokens(usage):
+    """Tokens that count against the rate limit; cache reads do not."""
+    if usage is None:
+        return None
+    return usage["input"] + usage["cache_write"] + usage["output"]
+
+
+def _future_billed_tokens(future):
+    """Billed tokens of a finished request future; a failed (or cancelled) request is not billed."""
+    if future.cancelled() or future.exception() is not None:
+        return 0
+    return _billed_tokens(token_usage(getattr(future.result(), "usage", None)))
+
+
+def _submit_hedgeable(request, timeout):
+    """
+    Start request(timeout) on the hedge pool as (future, started event), or
+    return None if every worker is busy.
+    """
+    if not _hedge_slots.acquire(blocking=False):
+        return None
+    started = threading.Event()
+
+    def run():
+        started.set()
+        try:
+            return request(timeout)
+        finally:
+            _hedge_slots.release()
+
+    return _hedge_executor.submit(run), started
+
+
+def _retry_after(exc):
+    response = getattr(exc, "response", None)
+    try:
+        return min(float(response.headers["retry-after"]), MAX_RETRY_AFTER)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class CallPolicy:
+    """Latency budget, retries and optional hedging for one call site."""
+
+    def __init__(self, name, budget, max_retries=3, backoff_base=0.5, backoff_max=8.0,
+                 hedge=False, hedge_min_samples=20, breaker=None):
+        self.name = name
+        self.budget = budget
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or BREAKER
+        # Recent successful latencies per call kind; they measure different things, so never mix them
+        self._latencies = {kind: deque(maxlen=200) for kind in LATENCY_KINDS}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "hedged": 0, "hedge_wins": 0, "hedges_skipped": 0,
+                       "short_circuited": 0, "fallbacks": 0}
+        self._tokens = {"input": 0, "output": 0, "cache_read": 0, "cache_write": 0}
+        # Usage of recent successful calls, with latency (time to first event for streams)
+        self.recent_calls = deque(maxlen=50)
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _record_usage(self, usage, latency):
+        if usage is None:
+            return
+        with self._lock:
+            for field, count in usage.items():
+                self._tokens[field] += count
+            self.recent_calls.append(dict(usage, latency=latency))
+
+    def stats(self):
+        """Counters, token totals (with the share of prompt tokens read from cache), p95 latency per call kind and breaker state."""
+        with self._lock:
+            tokens = dict(self._tokens)
+            prompt = tokens["input"] + tokens["cache_read"] + tokens["cache_write"]
+            tokens["cache_hit_rate"] = tokens["cache_read"] / prompt if prompt else None
+            p95 = {kind: self.p95(kind) for kind in LATENCY_KINDS}
+            return dict(self._stats, tokens=tokens, p95=p95, breaker=self.breaker.state)
+
+    def p95(self, kind="call"):
+        """95th percentile of recent successful latencies of one call kind, or None before there are any."""
+        samples = sorted(self._latencies[kind])
+        return samples[int(0.95 * (len(samples) - 1))] if samples else None
+
+    def _backoff(self, attempt, exc):
+        retry_after = _retry_after(exc)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _attempt(self, request, timeout, tokens):
+        enough = len(self._latencies["call"]) >= self.hedge_min_samples
+        hedge_after = self.p95("call") if self.hedge and enough else None
+        start = time.monotonic()
+        if hedge_after is None or hedge_after >= timeout:
+            result = request(timeout)
+        else:
+            result = self._hedged(request, timeout, hedge_after, tokens)
+        self._latencies["call"].append(time.monotonic() - start)
+        return result
+
+    def _hedged(self, request, timeout, hedge_after, tokens):
+        submitted = _submit_hedgeable(request, timeout)
+        if submitted is None:
+            # Busy enough to use every worker: no hedge, and no waiting for a worker either
+            self._count("hedges_skipped")
+            return request(timeout)
+        first, started = submitted
+        # The hedge delay counts from when the request is actually sent
+        started.wait()
+        done, _ = wait([first], timeout=hedge_after)
+        if done:
+            return first.result()
+        # The hedge is extra load, so it only goes out if the limiter has room right now
+        limiter = get_limiter()
+        hedge_grant = limiter.try_acquire(tokens)
+        if hedge_grant is None:
+            return first.result()
+        submitted = _submit_hedgeable(request, timeout - hedge_after)
+        if submitted is None:
+            limiter.settle(hedge_grant, 0)
+            self._count("hedges_skipped")
+            return first.result()
+        self._count("hedged")
+        second, _started = submitted
+        pending = {first, second}
+        winner = error = None
+        try:
+            while pending and winner is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        winner = future
+                        break
+                    error = future.exception()
+        finally:
+            # The caller settles its own grant against the winner; the hedge grant pays for the
+            # loser, once that finishes (it keeps running, and is billed, after we return)
+            loser = first if winner is second else second
+            loser.add_done_callback(lambda future: limiter.settle(hedge_grant, _future_billed_tokens(future)))
+        if winner is None:
+            raise error
+        if winner is second:
+            self._count("hedge_wins")
+        return winner.result()
+
+    def _retry_delay(self, exc, attempt, deadline):
+        """
+        After a failed attempt: seconds to wait before retrying, or None to
+        give up. Errors that are not transient are re-raised.
+        """
+        if not is_retryable(exc):
+            # The API answered, so it is up; the request itself was at fault
+            self.breaker.record_success()
+            raise exc
+        self.breaker.record_failure()
+        delay = self._backoff(attempt, exc)
+        if attempt + 1 > self.max_retries or time.monotonic() + delay >= deadline or not self.breaker.allow():
+            return None
+        self._count("retries")
+        return delay
+
+    def _give_up(self, exc, fallback):
+        if fallback is None:
+            raise exc
+        self._count("fallbacks")
+        return fallback()
+
+    def call(self, request, fallback=None, tokens=0):
+        """
+        Run request(timeout) under the policy and return its result.
+
+        tokens is the estimated cost reserved with the rate limiter for each
+        attempt. When the breaker is open, the limiter queue outlasts the
+        budget, or transient failures use up the retries or the budget,
+        fallback() is returned if given; otherwise the error
+        (CircuitOpenError, QueueTimeout or the last API error) is raised.
+        Other errors, such as a bad API key, are raised straight away.
+        """
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            return self._give_up(CircuitOpenError(f"{self.name}: the API is unavailable right now"), fallback)
+
+        deadline = time.monotonic() + self.budget
+        attempt = 0
+        limiter = get_limiter()
+        while True:
+            try:
+                grant = limiter.acquire(tokens, timeout=max(deadline - time.monotonic(), 0.0))
+            except QueueTimeout as exc:
+                self.breaker.release_trial()
+                return self._give_up(exc, fallback)
+            start = time.monotonic()
+            try:
+                result = self._attempt(request, max(deadline - time.monotonic(), 0.1), tokens)
+            except Exception as exc:
+                # A failed request is not billed for tokens
+                limiter.settle(grant, 0)
+                delay = self._retry_delay(exc, attempt, deadline)
+                if delay is None:
+                    return self._give_up(exc, fallback)
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self._succeeded(result, grant, start)
+            return result
+
+    async def acall(self, request, fallback=None, tokens=0):
+        """
+        call() for asyncio: awaits request(timeout), a coroutine.
+
+        Waiting for the rate limiter happens on a worker thread so the event
+        loop keeps running. There is no hedging; async callers fan out on
+        their own.
+        """
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            return self._give_up(CircuitOpenError(f"{self.name}: the API is unavailable right now"), fallback)
+
+        deadline = time.monotonic() + self.budget
+        attempt = 0
+        limiter = get_limiter()
+        while True:
+            try:
+                grant = await asyncio.to_thread(limiter.acquire, tokens, max(deadline - time.monotonic(), 0.0))
+            except QueueTimeout as exc:
+                self.breaker.release_trial()
+                return self._give_up(exc, fallback)
+            start = time.monotonic()
+            try:
+                result = await request(max(deadline - time.monotonic(), 0.1))
+            except Exception as exc:
+                limiter.settle(grant, 0)
+                delay = self._retry_delay(exc, attempt, deadline)
+                if delay is None:
+                    return self._give_up(exc, fallback)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self._latencies["acall"].append(time.monotonic() - start)
+            self._succeeded(result, grant, start)
+            return result
+
+    def _succeeded(self, result, grant, start):
+        usage = token_usage(getattr(result, "usage", None))
+        self._record_usage(usage, time.monotonic() - start)
+        get_limiter().settle(grant, _billed_tokens(usage))
+        self.breaker.record_success()
+
+    def stream(self, request, tokens=0):
+        """
+        Yield the events of a streaming request under the policy.
+
+        request(timeout) returns the SDK's stream manager. Failures before the
+        first event are retried like call(); once events have been yielded an
+        error is raised as-is, since the caller has already shown part of the
+        reply. Raises CircuitOpenError while the breaker is open, and
+        QueueTimeout if the rate limiter cannot admit it within the budget.
+        """
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError(f"{self.name}: the API is unavailable right now")
+
+        deadline = time.monotonic() + self.budget
+        limiter = get_limiter()
+        attempt = 0
+        while True:
+            try:
+                grant = limiter.acquire(tokens, timeout=max(deadline - time.monotonic(), 0.0))
+            except QueueTimeout:
+                self.breaker.release_trial()
+                raise
+            started = False
+            usage = None
+            start = time.monotonic()
+            try:
+                with request(max(deadline - start, 0.1)) as stream:
+                    for event in stream:
+                        if not started:
+                            started = True
+                            first_event = time.monotonic() - start
+                            self._latencies["first_event"].append(first_event)
+                        if event.type == "message_start":
+                            usage = token_usage(event.message.usage)
+                        elif event.type == "message_delta" and usage is not None:
+                            usage["output"] = event.usage.output_tokens
+                        yield event
+            except GeneratorExit:
+                # The caller stopped reading; the API itself was fine
+                limiter.settle(grant, _billed_tokens(usage))
+                self.breaker.record_success()
+                raise
+            except Exception as exc:
+                limiter.settle(grant, _billed_tokens(usage) or 0)
+                if not is_retryable(exc):
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                delay = self._backoff(attempt, exc)
+                attempt += 1
+                if started or attempt > self.max_retries or time.monotonic() + delay >= deadline or not self.breaker.allow():
+                    raise
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            self._record_usage(usage, first_event if started else None)
+            limiter.settle(grant, _billed_tokens(usage))
+            self.breaker.record_success()
+            return
+
+
+BREAKER = CircuitBreaker()
+
+POLICIES = {
+    "contemplation": CallPolicy("contemplation", budget=45, hedge=True),
+    "teaching": CallPolicy("teaching", budget=60, hedge=True),
+    # Opus is too expensive to hedge
+    "observer": CallPolicy("observer", budget=60),
+}
+
+
+def get_policy(name):
+    return POLICIES[name]
+
+
+def demo():
+    """Exercise retries, hedging and the breaker against a fake API with injected faults."""
+    import fake_anthropic
+
+    server, base_url = fake_anthropic.start()
+    client = anthropic.Anthropic(api_key="test", base_url=base_url, max_retries=0)
+    params = {"model": "fake", "max_tokens": 64, "messages": [{"role": "user", "content": "Hello"}]}
+
+    def request(timeout):
+        return client.messages.create(**params, timeout=timeout)
+
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=1)
+    policy = CallPolicy("demo", budget=5, backoff_base=0.05, hedge=True, hedge_min_samples=5, breaker=breaker)
+
+    server.faults.update(fail_next=2, fail_status=529)
+    policy.call(request)
+    print(f"two 529s then success: {policy.stats()}")
+
+    for _ in range(10):
+        policy.call(request)
+    server.faults.update(slow_rate=0.5, slow_latency=2.0)
+    for _ in range(10):
+        policy.call(request)
+    server.faults.update(slow_rate=0.0)
+    print(f"half the requests slow (hedged): {policy.stats()}")
+
+    server.faults.update(fail_rate=1.0, fail_status=503)
+    print("API down, with fallback:", policy.call(request, fallback=lambda: "curated fallback"))
+    print("breaker open, fails fast:", policy.call(request, fallback=lambda: "curated fallback"), policy.stats())
+    server.faults.update(fail_rate=0.0)
+    time.sleep(1.1)
+    policy.call(request)
+    print(f"recovered after reset: {policy.stats()}")
+
+    # Prompt caching: the fake API charges prefill time for uncached prompt tokens only
+    server.faults.update(prefill_per_1k=0.5)
+    cached = dict(params, system=[{"type": "text", "text": "Sit quietly. " * 400, "cache_control": {"type": "ephemeral"}}])
+    caching = CallPolicy("demo-cache", budget=10)
+    for _ in range(2):
+        caching.call(lambda timeout: client.messages.create(**cached, timeout=timeout))
+    for call in caching.recent_calls:
+        print(f"prompt cache: {call}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    demo()
@@ -0,0 +1,287 @@
+"""
+Compact columnar storage for large teaching corpora.
+
+A list of four-key dicts costs a dict, four key slots and (when loaded from
+JSON) a fresh copy of every philosopher/theme/tradition string per teaching.
+ColumnarTeachings instead keeps:
+
+    - philosopher, theme and tradition as interned category codes in array('H')
+    - all teaching text in one UTF-8 buffer, sliced through an offsets array
+
+and hands out lightweight TeachingRecord views that behave like the old dicts
+(teaching["philosopher"], .get(), dict(teaching), == against a dict), so
+render_teaching_card and the rest of the pages work unchanged.
+
+ColumnarTeachingStore is the TeachingStore counterpart: its indexes hold
+row positions per category code, and filter results are Selection views, so
+no per-teaching object lives longer than the caller holding it.
+
+Run `python columnar_teachings.py [N]` for a memory comparison against a
+list of dicts and its TeachingStore with N synthetic teachings (default
+100,000).
+"""
+
+import random
+from array import array
+from collections.abc import Mapping, Sequence
+from types import MappingProxyType
+
+from teaching_store import FIELDS, daily_index
+
+CATEGORY_FIELDS = ("philosopher", "theme", "tradition")
+KEYS = ("philosopher", "theme", "tradition", "teaching")
+
+
+class TeachingRecord(Mapping):
+    """Read-only dict-like view of one teaching in a ColumnarTeachings corpus."""
+
+    __slots__ = ("_corpus", "_index")
+
+    def __init__(self, corpus, index):
+        self._corpus = corpus
+        self._index = index
+
+    def __getitem__(self, key):
+        return self._corpus.field(self._index, key)
+
+    def __iter__(self):
+        return iter(KEYS)
+
+    def __len__(self):
+        return len(KEYS)
+
+    def __repr__(self):
+        return f"TeachingRecord({dict(self)!r})"
+
+
+class ColumnarTeachings(Sequence):
+    """Immutable sequence of teachings stored column-wise."""
+
+    def __init__(self, teachings):
+        self._values = {field: [] for field in CATEGORY_FIELDS}  # code -> string
+        codes = {field: {} for field in CATEGORY_FIELDS}  # string -> code
+        self._columns = {field: array("H") for field in CATEGORY_FIELDS}
+        self._offsets = array("Q", [0])
+        text = bytearray()
+
+        for teaching in teachings:
+            for field in CATEGORY_FIELDS:
+                value = teaching[field]
+                code = codes[field].get(value)
+                if code is None:
+                    code = len(self._values[field])
+                    if code > 0xFFFF:
+                        raise ValueError(f"Too many distinct {field} values for a 16-bit column")
+                    codes[field][value] = code
+                    self._values[field].append(value)
+                self._columns[field].append(code)
+            text += teaching["teaching"].encode("utf-8")
+            self._offsets.append(len(text))
+
+        self._text = bytes(text)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [TeachingRecord(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("teaching index out of range")
+        return TeachingRecord(self, index)
+
+    def field(self, index, key):
+        """Decode a single field of the teaching at index."""
+        if key == "teaching":
+            return self._text[self._offsets[index]:self._offsets[index + 1]].decode("utf-8")
+        if key in self._columns:
+            return self._values[key][self._columns[key][index]]
+        raise KeyError(key)
+
+    def values(self, field):
+        """Distinct values of a category field, in first-seen order."""
+        return tuple(self._values[field])
+
+    def column(self, field):
+        """The category codes of a field, one per teaching (indexes into values(field))."""
+        return self._columns[field]
+
+
+class Selection(Sequence):
+    """The teachings at some positions of a ColumnarTeachings corpus, decoded on access."""
+
+    __slots__ = ("_corpus", "_positions")
+
+    def __init__(self, corpus, positions):
+        self._corpus = corpus
+        self._positions = positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Selection(self._corpus, self._positions[index])
+        return self._corpus[self._positions[index]]
+
+
+class ColumnarTeachingStore:
+    """TeachingStore's interface over ColumnarTeachings, indexed by row position and category code."""
+
+    def __init__(self, corpus):
+        self._corpus = corpus
+        self._codes = {}     # field -> {value: code}
+        self._postings = {}  # field -> [positions as array("I"), one per code]
+        for field in FIELDS:
+            values = corpus.values(field)
+            self._codes[field] = {value: code for code, value in enumerate(values)}
+            postings = [array("I") for _ in values]
+            for position, code in enumerate(corpus.column(field)):
+                postings[code].append(position)
+            self._postings[field] = postings
+
+        self._facets = {
+            field: MappingProxyType({value: len(self._postings[field][code]) for value, code in self._codes[field].items()})
+            for field in FIELDS
+        }
+        self.philosophers = tuple(sorted(self._codes["philosopher"]))
+        self.traditions = tuple(sorted(self._codes["tradition"]))
+        self.themes = tuple(sorted(self._codes["theme"]))
+        # Memoised positions for multi-field filters; bounded by the distinct combinations in the data
+        self._combinations = {}
+
+    def __len__(self):
+        return len(self._corpus)
+
+    def __iter__(self):
+        return iter(self._corpus)
+
+    def __getitem__(self, index):
+        return self._corpus[index]
+
+    @property
+    def teachings(self):
+        return self._corpus
+
+    def facet_counts(self, field):
+        """Read-only {value: count} for theme, philosopher or tradition."""
+        return self._facets[field]
+
+    def _positions(self, field, value):
+        code = self._codes[field].get(value)
+        return self._postings[field][code] if code is not None else array("I")
+
+    def lookup(self, field, value):
+        """All teachings whose field equals value."""
+        return Selection(self._corpus, self._positions(field, value))
+
+    def filter(self, theme=None, philosopher=None, tradition=None):
+        """Teachings matching every given criterion ("all" means any theme), as a read-only sequence."""
+        if theme == "all":
+            theme = None
+        criteria = [(f, v) for f, v in zip(FIELDS, (theme, philosopher, tradition)) if v]
+        if not criteria:
+            return self._corpus
+        if len(criteria) == 1:
+            return self.lookup(*criteria[0])
+
+        key = (theme, philosopher, tradition)
+        positions = self._combinations.get(key)
+        if positions is None:
+            if any(v not in self._codes[f] for f, v in criteria):
+                positions = array("I")
+            else:
+                # Walk the smallest posting list and compare codes for the rest of the fields
+                candidates = min((self._positions(f, v) for f, v in criteria), key=len)
+                checks = [(self._corpus.column(f), self._codes[f][v]) for f, v in criteria]
+                positions = array("I", (p for p in candidates if all(column[p] == code for column, code in checks)))
+            self._combinations[key] = positions
+        return Selection(self._corpus, positions)
+
+    def count(self, theme=None, philosopher=None, tradition=None):
+        """Number of teachings matching the criteria."""
+        return len(self.filter(theme, philosopher, tradition))
+
+    def random(self, theme=None, philosopher=None, tradition=None):
+        """A random matching teaching, or None if nothing matches."""
+        matches = self.filter(theme, philosopher, tradition)
+        return random.choice(matches) if matches else None
+
+    def daily(self, day, theme=None, philosopher=None, tradition=None):
+        """The matching teaching for a given date, or None if nothing matches."""
+        matches = self.filter(theme, philosopher, tradition)
+        return matches[daily_index(day, len(matches))] if matches else None
+
+
+def _synthetic_corpus(n):
+    """n dicts with realistic category cardinality and fresh (un-interned) strings, as json.load would give."""
+    import json
+
+    rng = random.Random(0)
+    philosophers = [f"Philosopher {i}" for i in range(400)]
+    traditions = ["Indian", "Sufi", "Taoist", "Buddhist", "Western", "Stoic", "Western-Eastern"]
+    themes = ["mind", "love", "body", "ego", "freedom", "stillness"]
+    words = "the mind river silence love freedom being watch breath self truth moment sky".split()
+    rows = [
+        {
+            "philosopher": rng.choice(philosophers),
+            "theme": rng.choice(themes),
+            "tradition": rng.choice(traditions),
+            "teaching": " ".join(rng.choice(words) for _ in range(rng.randint(15, 40))) + ".",
+        }
+        for _ in range(n)
+    ]
+    return json.dumps(rows)
+
+
+def _retained(build):
+    """Bytes still allocated once build() has returned, and what it returned."""
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return retained, result
+
+
+def benchmark(n=100_000):
+    """
+    Print memory retained by n teachings loaded from JSON, as the app holds them:
+    the dicts plus their TeachingStore vs. ColumnarTeachings plus ColumnarTeachingStore.
+    """
+    import json
+
+    from teaching_store import TeachingStore
+
+    payload = _synthetic_corpus(n)
+
+    def dict_backend():
+        dicts = json.loads(payload)
+        return dicts, TeachingStore(dicts)
+
+    def columnar_backend():
+        # The dicts are only needed while packing; nothing keeps them afterwards
+        return ColumnarTeachingStore(ColumnarTeachings(json.loads(payload)))
+
+    dict_bytes, (dicts, dict_store) = _retained(dict_backend)
+    columnar_bytes, columnar_store = _retained(columnar_backend)
+
+    assert dict(columnar_store[n // 2]) == dicts[n // 2]
+    assert columnar_store.count("love", tradition="Sufi") == dict_store.count("love", tradition="Sufi")
+    mb = 1024 * 1024
+    print(f"{n:,} teachings")
+    print(f"  list of dicts + TeachingStore                 {dict_bytes / mb:8.1f} MB")
+    print(f"  ColumnarTeachings + ColumnarTeachingStore     {columnar_bytes / mb:8.1f} MB"
+          f"  ({dict_bytes / columnar_bytes:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    import sys
+
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,180 @@
+"""
+Contemplation generation shared by the Sit With This pages.
+
+Contemplations are cached on disk, keyed by the teaching, the model and the
+prompt template version — bump PROMPT_VERSION whenever the prompt changes so
+stale entries stop matching. Only replies from CONTEMPLATION_MODEL that were
+not cut off at max_tokens are cached; a reply from a fallback tier is shown
+but not stored under the primary model's key.
+
+This module must stay importable without Streamlit so offline tools can use it.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from call_policy import get_policy, is_unavailable
+from disk_cache import DiskLRUCache
+from llm_client import get_client
+from model_router import RoutedStream, is_model, primary_model, routed_create
+from rate_limit import estimate_tokens
+from singleflight import get_flights, request_key
+from teachings import THEMES
+
+# Calls are routed between tiers (see model_router); cache keys use the primary model
+CONTEMPLATION_MODEL = primary_model("contemplation")
+CONTEMPLATION_MAX_TOKENS = 1024
+PROMPT_VERSION = "1"
+
+CACHE_DIR = os.environ.get(
+    "CONTEMPLATION_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "contemplations"),
+)
+CACHE_TTL_SECONDS = int(os.environ.get("CONTEMPLATION_CACHE_TTL", 30 * 24 * 3600))
+CACHE_MAX_BYTES = int(os.environ.get("CONTEMPLATION_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide contemplation cache."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DiskLRUCache(CACHE_DIR, max_disk_bytes=CACHE_MAX_BYTES, ttl_seconds=CACHE_TTL_SECONDS)
+    return _store
+
+
+def build_prompt(teaching):
+    """Build the contemplation prompt for a teaching."""
+    theme_label = THEMES.get(teaching["theme"], {}).get("label", teaching["theme"])
+    return f"""You are a contemplative guide helping someone sit with a philosophical teaching for the day. The teaching is from {teaching['philosopher']} ({teaching['tradition']} tradition), on the theme of "{theme_label}":
+
+"{teaching['teaching']}"
+
+Write a brief contemplation (3-5 short paragraphs) that:
+1. Unpacks the core insight in simple, accessible language — what is the philosopher actually pointing at?
+2. Offers a practical way to notice this in daily life today — a specific observation or micro-practice
+3. Ends with a single question to sit with, not to answer but to carry through the day
+
+Keep the tone warm, personal, and grounded — like a wise friend speaking over morning tea. No bullet points. No academic language. Write as if speaking to someone who thinks deeply but wants to feel, not just understand."""
+
+
+def request_params(teaching):
+    """Messages API parameters for a teaching's contemplation."""
+    return {
+        "model": CONTEMPLATION_MODEL,
+        "max_tokens": CONTEMPLATION_MAX_TOKENS,
+        "messages": [{"role": "user", "content": build_prompt(teaching)}],
+    }
+
+
+def cache_key(teaching, model=CONTEMPLATION_MODEL, prompt_version=PROMPT_VERSION):
+    """Hash of the teaching, model and prompt version."""
+    payload = json.dumps(
+        [prompt_version, model, teaching["philosopher"], teaching["tradition"], teaching["theme"], teaching["teaching"]],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cacheable(model, stop_reason):
+    """Whether a reply may be cached under cache_key(): written by CONTEMPLATION_MODEL and not truncated."""
+    return is_model(model, CONTEMPLATION_MODEL) and stop_reason != "max_tokens"
+
+
+def fallback_contemplation(teaching):
+    """A short curated contemplation shown while the API is unavailable; never cached."""
+    return (
+        f"Stay with these words from {teaching['philosopher']} for a few breaths, without trying to explain them.\n\n"
+        "Notice which phrase draws you in and which one you would rather skip past. Both are worth looking at.\n\n"
+        "Where in your day might this already be true?"
+    )
+
+
+def get_cached_contemplation(teaching):
+    """Return the cached contemplation for a teaching, or None."""
+    return get_store().get(cache_key(teaching))
+
+
+def get_contemplation(teaching, api_key, fallback=True):
+    """
+    Return a contemplation for the teaching, calling Claude only on a cache miss.
+
+    Concurrent misses for the same teaching share one request. While the API
+    is unavailable the curated fallback is returned (or, with fallback=False,
+    the error is raised). Nothing is cached for failures.
+    """
+    key = cache_key(teaching)
+    store = get_store()
+    cached = store.get(key)
+    if cached is not None:
+        return cached
+
+    client = get_client(api_key)
+    params = request_params(teaching)
+    try:
+        message = get_flights().do(request_key(params, api_key), lambda: get_policy("contemplation").call(
+            lambda timeout: routed_create("contemplation", client, params, timeout),
+            tokens=estimate_tokens(params),
+        ))
+    except Exception as exc:
+        # The fallback is applied here rather than in the policy, since callers sharing the request may not want it
+        if not (fallback and is_unavailable(exc)):
+            raise
+        return fallback_contemplation(teaching)
+    text = message.content[0].text
+    if cacheable(message.model, message.stop_reason):
+        store.set(key, text)
+    return text
+
+
+def stream_contemplation(teaching, api_key):
+    """
+    Yield the contemplation in text chunks as Claude writes it.
+
+    A cached contemplation is yielded as a single chunk. The full text is
+    cached once the stream finishes; an abandoned stream caches nothing. If
+    the API is unavailable before anything was written, the curated fallback
+    is yielded instead. Concurrent streams for the same teaching share one
+    request.
+    """
+    key = request_key(dict(request_params(teaching), stream=True), api_key)
+    return get_flights().stream(key, lambda: _stream_contemplation(teaching, api_key))
+
+
+def _stream_contemplation(teaching, api_key):
+    key = cache_key(teaching)
+    store = get_store()
+    cached = store.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    client = get_client(api_key)
+    params = request_params(teaching)
+    parts = []
+    model = stop_reason = None
+    try:
+        for event in get_policy("contemplation").stream(
+            lambda timeout: RoutedStream("contemplation", client, params, timeout),
+            tokens=estimate_tokens(params),
+        ):
+            if event.type == "message_start":
+                model = event.message.model
+            elif event.type == "message_delta":
+                stop_reason = event.delta.stop_reason
+            elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                parts.append(event.delta.text)
+                yield event.delta.text
+    except Exception as exc:
+        if parts or not is_unavailable(exc):
+            raise
+        yield fallback_contemplation(teaching)
+        return
+    if model is not None and cacheable(model, stop_reason):
+        store.set(key, "".join(parts))
@@ -0,0 +1,189 @@
+"""
+A small two-tier cache: an in-memory LRU in front of a directory of JSON files.
+
+Entries expire after a TTL, and the disk tier is trimmed back under a byte
+budget by evicting the least recently used files first. Pinned keys are
+exempt from both.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class DiskLRUCache:
+    """Thread-safe LRU memory tier backed by one JSON file per key on disk."""
+
+    def __init__(self, directory, max_memory_items=256, max_disk_bytes=50 * 1024 * 1024, ttl_seconds=7 * 24 * 3600):
+        self.directory = directory
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()  # key -> (created, value)
+        self._disk = {}  # key -> (size, last_access)
+        self._disk_bytes = 0
+        self._pinned = set()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    # ── internals ──
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _scan(self):
+        """Rebuild the disk index from whatever earlier processes left behind."""
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                self._disk[name[:-5]] = (st.st_size, st.st_mtime)
+                self._disk_bytes += st.st_size
+
+    def _expired(self, key, created):
+        if key in self._pinned:
+            return False
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def _remember(self, key, created, value):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _drop_file(self, key):
+        size, _ = self._disk.pop(key, (0, 0))
+        self._disk_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _load(self, key):
+        """The record in key's file, or None (dropping the file) if it is unreadable or expired."""
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            self._drop_file(key)
+            return None
+        if self._expired(key, record["created"]):
+            self.delete(key)
+            return None
+        return record
+
+    def _evict(self):
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        for key, _ in sorted(self._disk.items(), key=lambda kv: kv[1][1]):
+            if key in self._pinned:
+                continue
+            self._drop_file(key)
+            self._memory.pop(key, None)
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+
+    # ── public API ──
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._expired(key, entry[0]):
+                    self.delete(key)
+                else:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+
+            record = self._load(key) if key in self._disk else None
+            if record is not None:
+                now = time.time()
+                self._disk[key] = (self._disk[key][0], now)
+                try:
+                    os.utime(self._path(key), (now, now))
+                except OSError:
+                    pass
+                self._remember(key, record["created"], record["value"])
+                self.hits += 1
+                return record["value"]
+
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Store a JSON-serialisable value under key in both tiers."""
+        created = time.time()
+        data = json.dumps({"created": created, "value": value}, ensure_ascii=False).encode("utf-8")
+        path = self._path(key)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # A uniquely named temp file per write, so processes sharing the directory never collide;
+            # the .tmp suffix keeps it out of _scan if a crash leaves it behind
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=f"{key}.", suffix=".tmp",
+                                             delete=False) as f:
+                try:
+                    f.write(data)
+                except BaseException:
+                    f.close()
+                    os.remove(f.name)
+                    raise
+            os.replace(f.name, path)
+
+            old_size, _ = self._disk.get(key, (0, 0))
+            self._disk[key] = (len(data), created)
+            self._disk_bytes += len(data) - old_size
+            self._remember(key, created, value)
+            self._evict()
+
+    def pin(self, key):
+        """Keep key (whether or not it is cached yet) out of TTL expiry and eviction."""
+        with self._lock:
+            self._pinned.add(key)
+
+    def delete(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+            self._drop_file(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._disk):
+                self._drop_file(key)
+            self._memory.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                return not self._expired(key, entry[0])
+            # The disk index only knows last access, so the age has to come from the file
+            return key in self._disk and self._load(key) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._disk)
+
+    def stats(self):
+        """Return hit/miss counters and current tier sizes."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
@@ -0,0 +1,329 @@
+"""
+A local stand-in for the Anthropic Messages API, for exercising the app offline.
+
+Serves just enough of the API for the SDK to talk to it:
+    POST /v1/messages                         canned text reply, or a tool call when one is forced
+                                              (streamed as server-sent events when "stream" is set)
+    POST /v1/messages/batches                 accept a Message Batch
+    GET  /v1/messages/batches/{id}            batch status (ends immediately)
+    GET  /v1/messages/batches/{id}/results    JSONL results
+    GET  /_faults, POST /_faults              read or update the injected faults
+
+Faults apply to /v1/messages and are held in server.faults:
+    latency        seconds added to every reply
+    slow_rate      fraction of replies delayed by a further slow_latency seconds
+    fail_rate      fraction of requests answered with fail_status
+    fail_next      answer the next N requests with fail_status
+    fail_status    429, 500, 503 or 529 (default 529, overloaded)
+    prefill_per_1k seconds of extra latency per 1,000 prompt tokens not read from cache
+
+Prompt caching is emulated: the prefix up to the last cache_control breakpoint
+(tools, then system, then messages) is remembered for CACHE_TTL_SECONDS, and
+usage reports it as cache_creation_input_tokens the first time and as
+cache_read_input_tokens while it stays warm. As with the real API, a prefix
+shorter than the model's minimum cacheable length is not cached at all.
+
+Run: python fake_anthropic.py --port 8765 [--fail-rate 0.2] [--latency 0.5]
+Then point the SDK at it: export ANTHROPIC_BASE_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _gist(params):
+    """The first dozen words of the last user message."""
+    content = params["messages"][-1]["content"]
+    if isinstance(content, list):
+        content = " ".join(block.get("text", "") for block in content)
+    return " ".join(content.split()[:12])
+
+
+def fake_reply(params):
+    """Deterministic reply text derived from the last user message."""
+    return (
+        f"This is a stand-in reply to: {_gist(params)}...\n\n"
+        "Notice what happens in you as you read it.\n\n"
+        "What is here before you name it?"
+    )
+
+
+def fake_tool_input(schema, gist):
+    """Smallest value that satisfies a tool's JSON schema, with stand-in strings."""
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: fake_tool_input(prop, gist) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [fake_tool_input(schema.get("items", {}), f"{gist} ({i + 1})") for i in range(schema.get("minItems", 1))]
+    if kind in ("integer", "number"):
+        return 0
+    if kind == "boolean":
+        return False
+    return f"A stand-in answer to: {gist}"
+
+
+CACHE_TTL_SECONDS = 300
+# Shortest prefix, in tokens, each model family caches; others use DEFAULT_MIN_CACHEABLE_TOKENS
+MIN_CACHEABLE_TOKENS = {
+    "claude-opus-4-5": 4096,
+    "claude-haiku-4-5": 4096,
+    "claude-3-5-haiku": 2048,
+    "claude-3-haiku": 2048,
+}
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+
+def min_cacheable_tokens(model):
+    """The shortest prefix model will cache, in tokens."""
+    return next((tokens for family, tokens in MIN_CACHEABLE_TOKENS.items() if model.startswith(family)),
+                DEFAULT_MIN_CACHEABLE_TOKENS)
+
+
+def cache_prefix(params):
+    """The request's cacheable prefix, serialized, or None without a cache_control breakpoint."""
+    segments = list(params.get("tools", []))
+    system = params.get("system", [])
+    segments += [{"type": "text", "text": system}] if isinstance(system, str) else system
+    for message in params.get("messages", []):
+        content = message["content"]
+        segments += [{"type": "text", "text": content}] if isinstance(content, str) else content
+    marked = [i for i, segment in enumerate(segments) if "cache_control" in segment]
+    if not marked:
+        return None
+    return json.dumps(segments[:marked[-1] + 1], sort_keys=True)
+
+
+def prompt_usage(params, prompt_cache=None):
+    """
+    Input usage for a request as {input_tokens, cache_creation_input_tokens,
+    cache_read_input_tokens}, updating prompt_cache ({prefix hash: expiry}).
+    """
+    total = len(json.dumps(params)) // 4
+    prefix = cache_prefix(params) if prompt_cache is not None else None
+    usage = {"input_tokens": total, "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+    if prefix is None or len(prefix) // 4 < min_cacheable_tokens(params.get("model", "")):
+        return usage
+    cached = min(len(prefix) // 4, total)
+    digest = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+    now = time.monotonic()
+    field = "cache_read_input_tokens" if prompt_cache.get(digest, 0) > now else "cache_creation_input_tokens"
+    # A hit refreshes the entry's lifetime, as the real cache does
+    prompt_cache[digest] = now + CACHE_TTL_SECONDS
+    usage[field] = cached
+    usage["input_tokens"] = total - cached
+    return usage
+
+
+def fake_message(params, prompt_cache=None):
+    text = fake_reply(params)
+    content = [{"type": "text", "text": text}]
+    stop_reason = "end_turn"
+    choice = params.get("tool_choice") or {}
+    if choice.get("type") == "tool":
+        tool = next(t for t in params.get("tools", []) if t["name"] == choice["name"])
+        content = [{"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}", "name": tool["name"],
+                    "input": fake_tool_input(tool["input_schema"], _gist(params))}]
+        text = json.dumps(content[0]["input"])
+        stop_reason = "tool_use"
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get("model", "fake-model"),
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": dict(prompt_usage(params, prompt_cache), output_tokens=len(text) // 4),
+    }
+
+
+ERROR_TYPES = {429: "rate_limit_error", 500: "api_error", 503: "api_error", 529: "overloaded_error"}
+
+DEFAULT_FAULTS = {"latency": 0.0, "slow_rate": 0.0, "slow_latency": 0.0, "fail_rate": 0.0, "fail_next": 0, "fail_status": 529,
+                  "prefill_per_1k": 0.0}
+
+
+def sse_events(message):
+    """The server-sent events a streamed reply to message is made of, as (event, data) pairs."""
+    start = dict(message, content=[], stop_reason=None, usage=dict(message["usage"], output_tokens=0))
+    yield "message_start", {"type": "message_start", "message": start}
+    for index, block in enumerate(message["content"]):
+        if block["type"] == "tool_use":
+            payload = json.dumps(block["input"])
+            yield "content_block_start", {"type": "content_block_start", "index": index,
+                                          "content_block": dict(block, input={})}
+            for i in range(0, len(payload), 16):
+                yield "content_block_delta", {"type": "content_block_delta", "index": index,
+                                              "delta": {"type": "input_json_delta", "partial_json": payload[i:i + 16]}}
+        else:
+            yield "content_block_start", {"type": "content_block_start", "index": index,
+                                          "content_block": {"type": "text", "text": ""}}
+            for word in block["text"].split(" "):
+                yield "content_block_delta", {"type": "content_block_delta", "index": index,
+                                              "delta": {"type": "text_delta", "text": word + " "}}
+        yield "content_block_stop", {"type": "content_block_stop", "index": index}
+    yield "message_delta", {"type": "message_delta", "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                            "usage": {"output_tokens": message["usage"]["output_tokens"]}}
+    yield "message_stop", {"type": "message_stop"}
+
+
+def _timestamp(delta=timedelta()):
+    return (datetime.now(timezone.utc) + delta).isoformat().replace("+00:00", "Z")
+
+
+class FakeAnthropicHandler(BaseHTTPRequestHandler):
+    server_version = "FakeAnthropic/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _batch(self, batch_id):
+        batch = self.server.batches[batch_id]
+        count = len(batch["results"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended",
+            "request_counts": {"processing": 0, "succeeded": count, "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": batch["created_at"],
+            "ended_at": batch["created_at"],
+            "expires_at": _timestamp(timedelta(days=1)),
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"http://{self.headers['Host']}/v1/messages/batches/{batch_id}/results",
+        }
+
+    def _injected_fault(self):
+        """Sleep for any injected latency; return an error status to send instead, or None."""
+        faults = self.server.faults
+        with self.server.faults_lock:
+            fail = faults["fail_next"] > 0 or random.random() < faults["fail_rate"]
+            if faults["fail_next"] > 0:
+                faults["fail_next"] -= 1
+            delay = faults["latency"] + (faults["slow_latency"] if random.random() < faults["slow_rate"] else 0.0)
+        if delay:
+            time.sleep(delay)
+        return faults["fail_status"] if fail else None
+
+    def _send_error(self, status):
+        data = json.dumps({"type": "error", "error": {"type": ERROR_TYPES.get(status, "api_error"),
+                                                      "message": "Injected fault"}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429:
+            self.send_header("retry-after", "1")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, message):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        for event, data in sse_events(message):
+            self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.close_connection = True
+
+    def do_HEAD(self):
+        self.send_response(404)
+        self.end_headers()
+
+    def do_POST(self):
+        if self.path.startswith("/v1/messages/batches"):
+            body = self._read_json()
+            batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+            self.server.batches[batch_id] = {
+                "created_at": _timestamp(),
+                "results": [
+                    {"custom_id": r["custom_id"], "result": {"type": "succeeded", "message": fake_message(r["params"])}}
+                    for r in body["requests"]
+                ],
+            }
+            self._send_json(200, self._batch(batch_id))
+        elif self.path.startswith("/v1/messages"):
+            params = self._read_json()
+            status = self._injected_fault()
+            if status:
+                self._send_error(status)
+                return
+            with self.server.faults_lock:
+                message = fake_message(params, self.server.prompt_cache)
+            uncached = message["usage"]["input_tokens"] + message["usage"]["cache_creation_input_tokens"]
+            prefill = self.server.faults["prefill_per_1k"] * uncached / 1000
+            if prefill:
+                time.sleep(prefill)
+            if params.get("stream"):
+                self._send_stream(message)
+            else:
+                self._send_json(200, message)
+        elif self.path == "/_faults":
+            with self.server.faults_lock:
+                self.server.faults.update(self._read_json())
+            self._send_json(200, self.server.faults)
+        else:
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+    def do_GET(self):
+        if self.path == "/_faults":
+            self._send_json(200, self.server.faults)
+            return
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts[:3] == ["v1", "messages", "batches"] and len(parts) >= 4 and parts[3] in self.server.batches:
+            if len(parts) == 5 and parts[4] == "results":
+                lines = "\n".join(json.dumps(r) for r in self.server.batches[parts[3]]["results"])
+                self._send_json(200, lines.encode("utf-8"), "application/binary")
+            else:
+                self._send_json(200, self._batch(parts[3]))
+        else:
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+
+def make_server(port=0, **faults):
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeAnthropicHandler)
+    server.batches = {}
+    server.prompt_cache = {}
+    server.faults = dict(DEFAULT_FAULTS, **faults)
+    server.faults_lock = threading.Lock()
+    return server
+
+
+def start(port=0, **faults):
+    """Start the fake API on a background thread. Returns (server, base_url)."""
+    server = make_server(port, **faults)
+    threading.Thread(target=server.serve_forever, name="fake-anthropic", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every reply")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--fail-status", type=int, default=529, help="status code for injected failures")
+    args = parser.parse_args()
+    server = make_server(args.port, latency=args.latency, fail_rate=args.fail_rate, fail_status=args.fail_status)
+    print(f"Fake Anthropic API listening on http://127.0.0.1:{server.server_address[1]}")
+    server.serve_forever()
@@ -0,0 +1,164 @@
+"""
+Incremental parser for a streamed flat JSON object of string fields.
+
+Numbers, true, false and null are accepted as field values too (reported as
+one close event each); nested objects and arrays are not.
+
+The Observer asks Claude for one JSON object with five string fields. Fed the
+response chunk by chunk, ObjectStreamParser reports each field as it opens,
+grows and completes, so the page can fill in each card while the rest of the
+object is still being written. Anything before the opening brace (such as a
+```json fence) is ignored, as is anything after the closing one.
+
+    parser = ObjectStreamParser()
+    for chunk in chunks:
+        for event, field, text in parser.feed(chunk):
+            ...  # ("open", field, ""), ("delta", field, text), ("close", field, value)
+    parser.result()  # {field: value}
+
+Run `python incremental_json.py` to check the parser against json.loads on
+sample objects fed in every chunk size.
+"""
+
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+class ObjectStreamParser:
+    """Feed text chunks of a JSON object; get field open/delta/close events back."""
+
+    def __init__(self):
+        self._state = "start"
+        self._key = []
+        self._field = None
+        self._value = []       # decoded characters of the open string value
+        self._escape = ""      # an escape sequence split across chunks
+        self._raw = []         # characters of an open scalar (number, true, false, null)
+        self._fields = {}
+
+    @property
+    def done(self):
+        return self._state == "done"
+
+    def result(self):
+        """Fields completed so far, in order."""
+        return dict(self._fields)
+
+    def feed(self, chunk):
+        """Consume a chunk and return the events it completes."""
+        events = []
+        delta = []
+        for ch in chunk:
+            state = self._state
+            if state == "string":
+                if self._escape:
+                    self._escape += ch
+                    decoded = self._decode_escape()
+                    if decoded is not None:
+                        delta.append(decoded)
+                elif ch == "\\":
+                    self._escape = ch
+                elif ch == '"':
+                    self._flush(delta, events)
+                    self._close(events, "".join(self._value))
+                else:
+                    delta.append(ch)
+            elif state == "start":
+                if ch == "{":
+                    self._state = "key_or_end"
+            elif state == "key_or_end":
+                if ch == '"':
+                    self._key = []
+                    self._state = "key"
+                elif ch == "}":
+                    self._state = "done"
+            elif state == "key":
+                if ch == '"':
+                    self._field = json.loads('"' + "".join(self._key) + '"')
+                    self._state = "colon"
+                else:
+                    self._key.append(ch)
+            elif state == "colon":
+                if ch == ":":
+                    self._state = "value"
+            elif state == "value":
+                if ch == '"':
+                    self._value = []
+                    self._state = "string"
+                    events.append(("open", self._field, ""))
+                elif ch not in _WHITESPACE:
+                    self._raw = [ch]
+                    self._state = "scalar"
+            elif state == "scalar":
+                # A scalar has no closing quote: the delimiter after it ends it, and also
+                # moves the parser on, so it must not be left for after_value to look for
+                if ch in _WHITESPACE or ch in ",}":
+                    self._close(events, json.loads("".join(self._raw)))
+                    if ch == ",":
+                        self._state = "key_or_end"
+                    elif ch == "}":
+                        self._state = "done"
+                else:
+                    self._raw.append(ch)
+            elif state == "after_value":
+                if ch == ",":
+                    self._state = "key_or_end"
+                elif ch == "}":
+                    self._state = "done"
+            if self._state == "done":
+                break
+        self._flush(delta, events)
+        return events
+
+    def _decode_escape(self):
+        """Decode the pending escape once it is complete; None while more is needed."""
+        escape = self._escape
+        if escape[1] != "u":
+            self._escape = ""
+            return json.loads(f'"{escape}"')
+        if len(escape) < 6:
+            return None
+        # A high surrogate needs its low half before it decodes to one character
+        if 0xD800 <= int(escape[2:6], 16) <= 0xDBFF and len(escape) < 12:
+            return None
+        self._escape = ""
+        return json.loads(f'"{escape}"')
+
+    def _flush(self, delta, events):
+        if delta and self._state == "string":
+            text = "".join(delta)
+            self._value.append(text)
+            events.append(("delta", self._field, text))
+        delta.clear()
+
+    def _close(self, events, value):
+        self._fields[self._field] = value
+        events.append(("close", self._field, value))
+        self._state = "after_value"
+
+
+def _check():
+    """Feed sample objects in every chunk size and compare with json.loads."""
+    samples = [
+        '{"a": 1, "b": "x"}',
+        '```json\n{"n": -2.5e3, "t": true, "f": false, "z": null, "s": "caf\\u00e9 \\ud83d\\ude00 \\"q\\""}\n```',
+        '{"a":1,"b":2}',
+        '{ "first" : "one" ,\n  "count" : 10 ,\n  "last" : "two" }',
+        '{}',
+    ]
+    for sample in samples:
+        expected = json.loads(sample[sample.index("{"):sample.rindex("}") + 1])
+        for size in range(1, len(sample) + 1):
+            parser = ObjectStreamParser()
+            closed = {}
+            for start in range(0, len(sample), size):
+                for event, field, value in parser.feed(sample[start:start + size]):
+                    if event == "close":
+                        closed[field] = value
+            assert parser.done and parser.result() == closed == expected, (sample, size, parser.result())
+    print(f"ok: {len(samples)} samples, every chunk size")
+
+
+if __name__ == "__main__":
+    _check()
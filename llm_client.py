@@ -0,0 +1,117 @@
+"""
+Process-wide pooled Anthropic clients, one per API key.
+
+Every LLM call site goes through get_client() so the httpx connection pool,
+TLS session and DNS lookup are paid for once per process instead of once per
+click. Clients left idle past CLIENT_IDLE_TTL are dropped, and at most
+MAX_CLIENTS are kept around. A dropped client is not closed, since another
+thread may still be mid-request on it; its connections go with it once the
+last user lets go. The shared clients do not retry on their own:
+retries, timeouts and the circuit breaker belong to call_policy.
+
+Tuning (environment variables):
+    ANTHROPIC_HTTP2              "1" to negotiate HTTP/2 (needs the h2 package)
+    ANTHROPIC_KEEPALIVE_EXPIRY   seconds an idle connection stays open (default 60)
+    ANTHROPIC_MAX_CONNECTIONS    connections per client (default 20)
+    ANTHROPIC_CLIENT_IDLE_TTL    seconds before an unused client is dropped (default 1800)
+"""
+
+import os
+import threading
+import time
+
+import anthropic
+import httpx
+
+HTTP2 = os.environ.get("ANTHROPIC_HTTP2", "0") == "1"
+KEEPALIVE_EXPIRY = float(os.environ.get("ANTHROPIC_KEEPALIVE_EXPIRY", 60))
+MAX_CONNECTIONS = int(os.environ.get("ANTHROPIC_MAX_CONNECTIONS", 20))
+CLIENT_IDLE_TTL = float(os.environ.get("ANTHROPIC_CLIENT_IDLE_TTL", 1800))
+MAX_CLIENTS = 16
+
+_clients = {}  # api key -> [client, http_client, last_used]
+_lock = threading.Lock()
+
+
+def _http2_supported():
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def _build_client(api_key):
+    http_client = anthropic.DefaultHttpxClient(
+        http2=HTTP2 and _http2_supported(),
+        limits=_limits(),
+    )
+    return anthropic.Anthropic(api_key=api_key, http_client=http_client, max_retries=0), http_client
+
+
+def _evict_idle(now):
+    """Forget clients idle for too long, then the least recently used beyond MAX_CLIENTS."""
+    for key, (_client, _http, last_used) in list(_clients.items()):
+        if now - last_used > CLIENT_IDLE_TTL:
+            del _clients[key]
+    while len(_clients) >= MAX_CLIENTS:
+        del _clients[min(_clients, key=lambda k: _clients[k][2])]
+
+
+def _entry(api_key):
+    api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
+    now = time.monotonic()
+    with _lock:
+        entry = _clients.get(api_key)
+        if entry is None:
+            _evict_idle(now)
+            entry = _clients[api_key] = [*_build_client(api_key), now]
+        entry[2] = now
+        return entry
+
+
+def get_client(api_key=None):
+    """Return the shared client for an API key (defaults to ANTHROPIC_API_KEY)."""
+    return _entry(api_key)[0]
+
+
+def make_async_client(api_key=None, max_retries=2):
+    """
+    Build an AsyncAnthropic client with the same pool settings.
+
+    Async clients are tied to the event loop they are used on, so they are not
+    shared; the caller owns the client and should close it when done. Pass
+    max_retries=0 when the calls go through call_policy, which retries itself.
+    """
+    http_client = anthropic.DefaultAsyncHttpxClient(
+        http2=HTTP2 and _http2_supported(),
+        limits=_limits(),
+    )
+    return anthropic.AsyncAnthropic(api_key=api_key or os.environ.get("ANTHROPIC_API_KEY"), http_client=http_client,
+                                    max_retries=max_retries)
+
+
+def warm_connection(api_key=None):
+    """
+    Open a pooled connection to the API in the background.
+
+    Any response (even a 404) leaves a live keep-alive connection in the pool,
+    so the first real request skips DNS and the TLS handshake.
+    """
+    client, http_client, _ = _entry(api_key)
+
+    def _warm():
+        try:
+            http_client.head(str(client.base_url), timeout=5)
+        except Exception:
+            pass
+
+    threading.Thread(target=_warm, name="anthropic-warmup", daemon=True).start()
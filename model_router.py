@@ -0,0 +1,368 @@
+"""
+Latency-aware model routing for the LLM call sites.
+
+Each task has an ordered list of model tiers. Calls go to the first tier that
+is not cooling down. A tier cools down for ROUTER_COOLDOWN seconds when it is
+rate-limited or overloaded (and the call is retried on the next tier straight
+away), or when its recent p95 latency breaks the task's SLO: time to first
+event for streams, total latency for blocking calls. Once the cool-down ends
+the tier is tried again, and its latency samples start afresh.
+
+max_tokens adapts to each task's observed output lengths: once a model has
+ROUTER_MIN_SAMPLES replies, calls ask for their p99 plus headroom, capped at
+the call site's own max_tokens. A reply cut off at the limit counts as a full
+ceiling-length sample, so the limit grows back quickly.
+
+A request re-sent to the next tier is a new upstream request, so it is
+admitted by the rate limiter first; if it cannot get in within the call's
+timeout, the original rate-limit error is raised to the caller's policy.
+
+Every decision is recorded with its latency, token usage and estimated cost,
+in stats() and in an append-only JSONL log (MODEL_ROUTING_LOG), so tiers can
+be compared.
+
+Models per task can be overridden with comma-separated environment variables,
+e.g. TEACHING_MODELS=claude-haiku-4-5,claude-sonnet-4-20250514.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import anthropic
+
+from call_policy import token_usage
+from rate_limit import QueueTimeout, estimate_tokens, get_limiter
+
+logger = logging.getLogger(__name__)
+
+ROUTER_COOLDOWN = float(os.environ.get("ROUTER_COOLDOWN", 120))
+ROUTER_MIN_SAMPLES = int(os.environ.get("ROUTER_MIN_SAMPLES", 20))
+MAX_TOKENS_HEADROOM = 1.25
+MIN_MAX_TOKENS = 256
+ROUTING_LOG = os.environ.get(
+    "MODEL_ROUTING_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "model_routing.jsonl"),
+)
+
+
+def _models(env, default):
+    return [m.strip() for m in os.environ.get(env, default).split(",") if m.strip()]
+
+
+# Tiers in order of preference, and latency SLOs in seconds
+TASKS = {
+    "contemplation": {
+        "tiers": _models("CONTEMPLATION_MODELS", "claude-sonnet-4-20250514,claude-haiku-4-5"),
+        "slo": {"first_token": 4.0, "total": 30.0},
+    },
+    # Short, formulaic output: the small model is the primary; the larger one only takes over while it is unavailable
+    "teaching": {
+        "tiers": _models("TEACHING_MODELS", "claude-haiku-4-5,claude-sonnet-4-20250514"),
+        "slo": {"first_token": 3.0, "total": 15.0},
+    },
+    "observer": {
+        "tiers": _models("OBSERVER_MODELS", "claude-opus-4-5,claude-sonnet-4-5"),
+        "slo": {"first_token": 6.0, "total": 40.0},
+    },
+}
+
+# USD per million tokens: (input, output). Cache writes cost 1.25x input, cache reads 0.1x.
+PRICES = {
+    "claude-opus-4-5": (5.0, 25.0),
+    "claude-sonnet-4-5": (3.0, 15.0),
+    "claude-sonnet-4-20250514": (3.0, 15.0),
+    "claude-haiku-4-5": (1.0, 5.0),
+}
+
+
+def primary_model(task):
+    """The preferred model for a task."""
+    return TASKS[task]["tiers"][0]
+
+
+def is_model(answered, model):
+    """Whether a response's model id is model itself or a dated snapshot of it (aliases resolve to model-YYYYMMDD)."""
+    return answered == model or answered.startswith(f"{model}-")
+
+
+def estimate_cost(model, usage):
+    """Estimated USD cost of a call's token usage, or None for a model without a price."""
+    if model not in PRICES or usage is None:
+        return None
+    input_price, output_price = PRICES[model]
+    prompt = usage["input"] + 1.25 * usage["cache_write"] + 0.1 * usage["cache_read"]
+    return (prompt * input_price + usage["output"] * output_price) / 1_000_000
+
+
+def is_rate_limited(exc):
+    """429 rate limits and 529 overloaded errors: the model's capacity, not the request, is the problem."""
+    return isinstance(exc, anthropic.APIStatusError) and exc.status_code in (429, 529)
+
+
+def _admit_fallback(params, timeout, exc):
+    """
+    Admit a request about to be re-sent to the next tier with the rate limiter,
+    or re-raise exc (the rate-limit error that caused it) if it cannot get in
+    within timeout.
+    """
+    limiter = get_limiter()
+    try:
+        grant = limiter.acquire(estimate_tokens(params), timeout=timeout)
+    except QueueTimeout:
+        raise exc from None
+    # The caller's own grant is settled against the reply this request returns, so only the request counts here
+    limiter.settle(grant, 0)
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+class Decision:
+    """One routing choice: the model and max_tokens a call was sent with, and why."""
+
+    __slots__ = ("task", "model", "tier", "max_tokens", "ceiling", "reason", "units")
+
+    def __init__(self, task, model, tier, max_tokens, ceiling, reason, units):
+        self.task = task
+        self.model = model
+        self.tier = tier
+        self.max_tokens = max_tokens
+        self.ceiling = ceiling
+        self.reason = reason
+        self.units = units
+
+
+class ModelRouter:
+    """Chooses a model tier and max_tokens per call, and learns from how each call went."""
+
+    def __init__(self, tasks=TASKS, cooldown=ROUTER_COOLDOWN, min_samples=ROUTER_MIN_SAMPLES, log_path=ROUTING_LOG):
+        self.tasks = tasks
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.log_path = log_path
+        self._cooling = {}   # (task, model) -> (until, reason)
+        self._latency = {}   # (task, model, "first_token" | "total") -> recent seconds
+        self._outputs = {}   # (task, model) -> recent output tokens per unit
+        self._tiers = {}     # (task, model) -> aggregate counters
+        self._lock = threading.Lock()
+
+    def choose(self, task, ceiling, units=1):
+        """
+        Pick the model and max_tokens for a call that may use up to ceiling tokens.
+
+        units scales the learned output length for calls that ask for several
+        items at once (e.g. count teachings).
+        """
+        tiers = self.tasks[task]["tiers"]
+        now = time.monotonic()
+        with self._lock:
+            reason = "primary"
+            for tier, model in enumerate(tiers):
+                until, why = self._cooling.get((task, model), (0.0, None))
+                if until <= now or tier == len(tiers) - 1:
+                    break
+                # Explained by the first tier skipped
+                if reason == "primary":
+                    reason = why
+            return Decision(task, model, tier, self._max_tokens(task, model, ceiling, units), ceiling, reason, units)
+
+    def _max_tokens(self, task, model, ceiling, units):
+        samples = self._outputs.get((task, model))
+        if not samples or len(samples) < self.min_samples:
+            return ceiling
+        learned = math.ceil(_percentile(samples, 0.99) * units * MAX_TOKENS_HEADROOM / 64) * 64
+        return max(min(learned, ceiling), min(MIN_MAX_TOKENS, ceiling))
+
+    def _cool(self, task, model, reason, now):
+        self._cooling[(task, model)] = (now + self.cooldown, reason)
+        for kind in ("first_token", "total"):
+            self._latency.pop((task, model, kind), None)
+        logger.warning("Routing %s away from %s for %ss (%s)", task, model, self.cooldown, reason)
+
+    def record(self, decision, latency, first_token=None, usage=None, stop_reason=None, error=None):
+        """Record how a routed call went, cooling its tier down if it was rate-limited or too slow."""
+        task, model = decision.task, decision.model
+        slo = self.tasks[task]["slo"]
+        now = time.monotonic()
+        cost = estimate_cost(model, usage)
+        with self._lock:
+            tier = self._tiers.setdefault((task, model), {
+                "calls": 0, "errors": 0, "rate_limited": 0, "downgraded": 0,
+                "input": 0, "output": 0, "cache_read": 0, "cache_write": 0, "cost": 0.0,
+            })
+            tier["calls"] += 1
+            tier["downgraded"] += decision.tier > 0
+            if error is not None:
+                tier["errors"] += 1
+                if is_rate_limited(error):
+                    tier["rate_limited"] += 1
+                    self._cool(task, model, "rate_limited", now)
+            else:
+                for field in ("input", "output", "cache_read", "cache_write"):
+                    tier[field] += usage[field] if usage else 0
+                tier["cost"] += cost or 0.0
+                if usage:
+                    output = decision.ceiling if stop_reason == "max_tokens" else usage["output"]
+                    self._outputs.setdefault((task, model), deque(maxlen=200)).append(output / decision.units)
+
+                # Streams are judged on time to first event, blocking calls on the whole call
+                kind, measured = ("first_token", first_token) if first_token is not None else ("total", latency)
+                samples = self._latency.setdefault((task, model, kind), deque(maxlen=50))
+                samples.append(measured)
+                if len(samples) >= self.min_samples and _percentile(samples, 0.95) > slo[kind] \
+                        and decision.tier < len(self.tasks[task]["tiers"]) - 1:
+                    self._cool(task, model, "slo", now)
+
+            entry = {
+                "at": time.time(), "task": task, "model": model, "tier": decision.tier, "reason": decision.reason,
+                "max_tokens": decision.max_tokens, "latency": round(latency, 3),
+                "first_token": None if first_token is None else round(first_token, 3),
+                "usage": usage, "stop_reason": stop_reason, "cost": cost,
+                "error": None if error is None else type(error).__name__,
+            }
+            try:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError:
+                logger.exception("Could not write the routing log")
+
+    def stats(self):
+        """Per task and model: counters, token totals, cost, latency percentiles and cool-down state."""
+        now = time.monotonic()
+        with self._lock:
+            report = {}
+            for (task, model), tier in self._tiers.items():
+                entry = dict(tier)
+                for kind in ("first_token", "total"):
+                    samples = self._latency.get((task, model, kind))
+                    if samples:
+                        entry[f"{kind}_p50"] = _percentile(samples, 0.5)
+                        entry[f"{kind}_p95"] = _percentile(samples, 0.95)
+                until, reason = self._cooling.get((task, model), (0.0, None))
+                entry["cooling"] = reason if until > now else None
+                report.setdefault(task, {})[model] = entry
+            return report
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Return the process-wide model router."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter()
+    return _router
+
+
+def routed_create(task, client, params, timeout, units=1):
+    """
+    client.messages.create(**params) with the model and max_tokens chosen by
+    the router; params["max_tokens"] is the ceiling. A rate-limited tier is
+    skipped for the next one straight away.
+    """
+    router = get_router()
+    while True:
+        decision = router.choose(task, params["max_tokens"], units)
+        start = time.monotonic()
+        try:
+            message = client.messages.create(**dict(params, model=decision.model, max_tokens=decision.max_tokens),
+                                             timeout=timeout)
+        except Exception as exc:
+            router.record(decision, time.monotonic() - start, error=exc)
+            if is_rate_limited(exc) and decision.tier < len(router.tasks[task]["tiers"]) - 1:
+                _admit_fallback(params, timeout, exc)
+                continue
+            raise
+        router.record(decision, time.monotonic() - start, usage=token_usage(message.usage),
+                      stop_reason=message.stop_reason)
+        return message
+
+
+async def routed_acreate(task, client, params, timeout, units=1):
+    """routed_create() for an AsyncAnthropic client."""
+    router = get_router()
+    while True:
+        decision = router.choose(task, params["max_tokens"], units)
+        start = time.monotonic()
+        try:
+            message = await client.messages.create(**dict(params, model=decision.model, max_tokens=decision.max_tokens),
+                                                   timeout=timeout)
+        except Exception as exc:
+            router.record(decision, time.monotonic() - start, error=exc)
+            if is_rate_limited(exc) and decision.tier < len(router.tasks[task]["tiers"]) - 1:
+                await asyncio.to_thread(_admit_fallback, params, timeout, exc)
+                continue
+            raise
+        router.record(decision, time.monotonic() - start, usage=token_usage(message.usage),
+                      stop_reason=message.stop_reason)
+        return message
+
+
+class RoutedStream:
+    """
+    Stand-in for client.messages.stream(**params) that routes like
+    routed_create() and records the time to first event.
+    """
+
+    def __init__(self, task, client, params, timeout, units=1):
+        self.task = task
+        self.client = client
+        self.params = params
+        self.timeout = timeout
+        self.units = units
+        self.router = get_router()
+        self._manager = None
+
+    def __enter__(self):
+        while True:
+            self.decision = self.router.choose(self.task, self.params["max_tokens"], self.units)
+            self._start = time.monotonic()
+            self._first_token = None
+            self._usage = None
+            self._stop_reason = None
+            self._manager = self.client.messages.stream(
+                **dict(self.params, model=self.decision.model, max_tokens=self.decision.max_tokens),
+                timeout=self.timeout,
+            )
+            try:
+                stream = self._manager.__enter__()
+            except Exception as exc:
+                self.router.record(self.decision, time.monotonic() - self._start, error=exc)
+                if is_rate_limited(exc) and self.decision.tier < len(self.router.tasks[self.task]["tiers"]) - 1:
+                    _admit_fallback(self.params, self.timeout, exc)
+                    continue
+                raise
+            return self._events(stream)
+
+    def _events(self, stream):
+        for event in stream:
+            if self._first_token is None:
+                self._first_token = time.monotonic() - self._start
+            if event.type == "message_start":
+                self._usage = token_usage(event.message.usage)
+            elif event.type == "message_delta":
+                self._stop_reason = event.delta.stop_reason
+                if self._usage is not None:
+                    self._usage["output"] = event.usage.output_tokens
+            yield event
+
+    def __exit__(self, exc_type, exc, tb):
+        suppress = self._manager.__exit__(exc_type, exc, tb)
+        # A reader that stopped early (GeneratorExit) says nothing about the model
+        if exc_type is None or isinstance(exc, Exception):
+            self.router.record(self.decision, time.monotonic() - self._start, first_token=self._first_token,
+                               usage=self._usage, stop_reason=self._stop_reason, error=exc)
+        return suppress
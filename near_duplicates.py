@@ -0,0 +1,150 @@
+"""
+Near-duplicate detection for generated teachings with MinHash and LSH banding.
+
+Each teaching is reduced to a MinHash signature over its character 5-grams,
+and the signature is split into BANDS bands of ROWS rows. Two teachings with
+Jaccard similarity s share a bucket in some band with probability
+1 - (1 - s**ROWS) ** BANDS, an S-curve whose midpoint is (1/BANDS) ** (1/ROWS).
+With 32 bands of 2 rows the midpoint is about 0.18, well below
+DEFAULT_THRESHOLD, so a pair at the threshold becomes a candidate with
+probability 0.9999 (and one at 0.3 with 0.95). The candidates are then
+checked against their exact Jaccard similarity, not the signature estimate,
+so a lookup compares against a few candidates instead of the whole corpus
+without the estimate's noise deciding borderline pairs.
+
+Accepted generated teachings are appended to GENERATED_LOG, so the index
+remembers them across restarts.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.5
+
+GENERATED_LOG = os.environ.get(
+    "GENERATED_TEACHINGS_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "generated_teachings.jsonl"),
+)
+
+_NON_WORD = re.compile(r"[^\w ]+")
+
+
+def shingles(text):
+    """Character 5-grams of the lowercased text with punctuation stripped."""
+    text = " ".join(_NON_WORD.sub(" ", text.lower()).split())
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def _hash64(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _shingle_hashes(text):
+    """Sorted, distinct 64-bit hashes of a text's shingles."""
+    return np.unique(np.fromiter((_hash64(s) for s in shingles(text)), dtype=np.uint64))
+
+
+def jaccard(a, b):
+    """Exact Jaccard similarity of two sorted, distinct shingle-hash arrays."""
+    common = len(np.intersect1d(a, b, assume_unique=True))
+    return common / (len(a) + len(b) - common)
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of teachings, bucketed by LSH band."""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, seed=1):
+        self.threshold = threshold
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: (a * x + b) mod 2**64 with odd a, keeping the high 32 bits
+        self._a = rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+        self._teachings = []
+        self._shingles = []
+        self._buckets = [defaultdict(list) for _ in range(BANDS)]
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._teachings)
+
+    def signature(self, text, hashes=None):
+        """MinHash signature of a text (or of its shingle hashes): NUM_PERM uint32 minima."""
+        if hashes is None:
+            hashes = _shingle_hashes(text)
+        with np.errstate(over="ignore"):
+            permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [signature[i * ROWS:(i + 1) * ROWS].tobytes() for i in range(BANDS)]
+
+    def add(self, teaching, hashes=None):
+        """Index a teaching (a dict with a "teaching" key)."""
+        if hashes is None:
+            hashes = _shingle_hashes(teaching["teaching"])
+        signature = self.signature(None, hashes)
+        with self._lock:
+            doc_id = len(self._teachings)
+            self._teachings.append(teaching)
+            self._shingles.append(hashes)
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band][key].append(doc_id)
+
+    def query(self, text, hashes=None):
+        """Indexed teachings whose Jaccard similarity to text passes the threshold, best first."""
+        if hashes is None:
+            hashes = _shingle_hashes(text)
+        signature = self.signature(None, hashes)
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates.update(self._buckets[band].get(key, ()))
+            matches = []
+            for doc_id in candidates:
+                similarity = jaccard(self._shingles[doc_id], hashes)
+                if similarity >= self.threshold:
+                    matches.append((self._teachings[doc_id], similarity))
+        return sorted(matches, key=lambda m: m[1], reverse=True)
+
+    def find_duplicate(self, text):
+        """The closest near-duplicate of text as (teaching, similarity), or None."""
+        matches = self.query(text)
+        return matches[0] if matches else None
+
+    def accept(self, teaching, log_path=GENERATED_LOG):
+        """
+        Check a generated teaching and, if it is new, index and log it.
+
+        Returns None when accepted, or the (teaching, similarity) it duplicates.
+        """
+        hashes = _shingle_hashes(teaching["teaching"])
+        with self._lock:
+            matches = self.query(teaching["teaching"], hashes)
+            if matches:
+                return matches[0]
+            self.add(teaching, hashes)
+            if log_path:
+                os.makedirs(os.path.dirname(log_path), exist_ok=True)
+                with open(log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(dict(teaching), ensure_ascii=False) + "\n")
+        return None
+
+
+def load_generated(log_path=GENERATED_LOG):
+    """Previously accepted generated teachings, oldest first."""
+    if not os.path.exists(log_path):
+        return []
+    with open(log_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,206 @@
+"""
+Result cache for The Observer's analyses.
+
+Inputs are normalized (case, whitespace, punctuation) before lookup, so
+"I can't stop overthinking" and "i cant stop overthinking." share an entry.
+When there is no exact hit, a local character-trigram hashing vectorizer
+finds the most similar cached input, and its result is reused if the cosine
+similarity passes OBSERVER_SIMILARITY_THRESHOLD and the two inputs differ
+only by typos: the same number of words, each either equal or one edit away
+from its counterpart (and at least TYPO_MIN_LENGTH letters long). Trigram
+similarity alone cannot tell "I hate myself for it" from "I love myself for
+it" (0.90), or "I know I shouldn't" from "I know I should" (0.97).
+
+closest() serves the page's fallback while the API is unavailable; it only
+offers inputs at least OBSERVER_FALLBACK_SIMILARITY alike.
+
+Results live in a DiskLRUCache. Pinned inputs (the page's canned examples)
+are kept out of TTL expiry and eviction. The texts behind cached results
+are kept in an append-only index file next to the cache, which feeds the
+approximate index on start.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+
+from disk_cache import DiskLRUCache
+
+CACHE_DIR = os.environ.get(
+    "OBSERVER_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "observations"),
+)
+CACHE_TTL_SECONDS = int(os.environ.get("OBSERVER_CACHE_TTL", 30 * 24 * 3600))
+CACHE_MAX_BYTES = int(os.environ.get("OBSERVER_CACHE_MAX_BYTES", 20 * 1024 * 1024))
+SIMILARITY_THRESHOLD = float(os.environ.get("OBSERVER_SIMILARITY_THRESHOLD", 0.9))
+FALLBACK_SIMILARITY = float(os.environ.get("OBSERVER_FALLBACK_SIMILARITY", 0.8))
+TYPO_MIN_LENGTH = 5
+
+NGRAM_SIZE = 3
+HASH_BUCKETS = 2 ** 20
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+
+
+def normalize(text):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(_PUNCTUATION.sub("", text.lower()).split())
+
+
+def vectorize(normalized):
+    """L2-normalized hashed character-trigram counts, as {bucket: weight}."""
+    padded = f" {normalized} "
+    counts = Counter(
+        zlib.crc32(padded[i:i + NGRAM_SIZE].encode("utf-8")) % HASH_BUCKETS
+        for i in range(max(len(padded) - NGRAM_SIZE + 1, 1))
+    )
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {bucket: c / norm for bucket, c in counts.items()}
+
+
+def _one_edit(a, b):
+    """Whether a becomes b by one insertion, deletion, substitution or swap of adjacent letters."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    return a[i + 1:] == b[i + 1:] or (a[i:i + 2] == b[i:i + 2][::-1] and a[i + 2:] == b[i + 2:])
+
+
+def typo_variants(a, b):
+    """Whether two normalized inputs say the same words, allowing one-edit typos in longer words."""
+    words_a, words_b = a.split(), b.split()
+    if len(words_a) != len(words_b):
+        return False
+    return all(
+        x == y or min(len(x), len(y)) >= TYPO_MIN_LENGTH and _one_edit(x, y)
+        for x, y in zip(words_a, words_b)
+    )
+
+
+class ObserverCache:
+    """Exact and approximate lookup of earlier analyses."""
+
+    def __init__(self, namespace, directory=CACHE_DIR, threshold=SIMILARITY_THRESHOLD, pinned=()):
+        """
+        namespace separates results from different models or prompts (e.g. a
+        hash of both); pinned lists inputs whose results are never evicted.
+        """
+        self.namespace = namespace
+        self.threshold = threshold
+        self._store = DiskLRUCache(directory, max_disk_bytes=CACHE_MAX_BYTES, ttl_seconds=CACHE_TTL_SECONDS)
+        self._index_path = os.path.join(os.path.dirname(directory), f"{os.path.basename(directory)}_index.jsonl")
+        self._postings = {}  # bucket -> {key: weight}
+        self._inputs = {}  # key -> normalized input, for every indexed entry
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.approximate_hits = 0
+        self.misses = 0
+
+        for text in pinned:
+            self._store.pin(self._key(normalize(text)))
+        self._load_index()
+
+    def _key(self, normalized):
+        return hashlib.sha256(f"{self.namespace}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def _load_index(self):
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry["namespace"] == self.namespace:
+                    self._index(self._key(entry["input"]), entry["input"])
+
+    def _index(self, key, normalized):
+        if key in self._inputs:
+            return
+        self._inputs[key] = normalized
+        for bucket, weight in vectorize(normalized).items():
+            self._postings.setdefault(bucket, {})[key] = weight
+
+    def _unindex(self, key):
+        self._inputs.pop(key, None)
+        for postings in self._postings.values():
+            postings.pop(key, None)
+
+    def _nearest(self, normalized):
+        """(key, cosine) of the most similar indexed input, or (None, 0.0)."""
+        scores = Counter()
+        for bucket, weight in vectorize(normalized).items():
+            for key, other in self._postings.get(bucket, {}).items():
+                scores[key] += weight * other
+        if not scores:
+            return None, 0.0
+        return scores.most_common(1)[0]
+
+    def lookup(self, text):
+        """
+        A cached result for text as (result, kind), where kind is "exact" or
+        "approximate"; (None, None) on a miss.
+        """
+        normalized = normalize(text)
+        result = self._store.get(self._key(normalized))
+        if result is not None:
+            with self._lock:
+                self.exact_hits += 1
+            return result, "exact"
+
+        with self._lock:
+            key, similarity = self._nearest(normalized)
+            alike = key is not None and similarity >= self.threshold and typo_variants(normalized, self._inputs[key])
+        if alike:
+            result = self._store.get(key)
+            if result is not None:
+                with self._lock:
+                    self.approximate_hits += 1
+                return result, "approximate"
+            # Expired or evicted since it was indexed
+            with self._lock:
+                self._unindex(key)
+
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def closest(self, text, min_similarity=FALLBACK_SIMILARITY):
+        """
+        The result for the most similar cached input, as (result, similarity),
+        or (None, 0.0) if none is at least min_similarity alike.
+        """
+        with self._lock:
+            key, similarity = self._nearest(normalize(text))
+        result = self._store.get(key) if key is not None and similarity >= min_similarity else None
+        return (result, similarity) if result is not None else (None, 0.0)
+
+    def store(self, text, result):
+        """Cache a result for text and make it available to approximate lookups."""
+        normalized = normalize(text)
+        key = self._key(normalized)
+        self._store.set(key, result)
+        with self._lock:
+            if key in self._inputs:
+                return
+            self._index(key, normalized)
+            os.makedirs(os.path.dirname(self._index_path), exist_ok=True)
+            with open(self._index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"namespace": self.namespace, "input": normalized}, ensure_ascii=False) + "\n")
+
+    def stats(self):
+        """Exact/approximate hit and miss counters plus the underlying cache's stats."""
+        with self._lock:
+            counters = {"exact_hits": self.exact_hits, "approximate_hits": self.approximate_hits, "misses": self.misses}
+        return dict(counters, store=self._store.stats())
@@ -0,0 +1,63 @@
+"""
+Page stylesheets, kept in styles/ and injected inline.
+
+Streamlit's static file serving only sends a fixed list of file types (images
+and fonts) with their real content type; anything else, .css included, is
+served as text/plain with X-Content-Type-Options: nosniff, which browsers
+refuse to apply as a stylesheet. So the pages still send their styles as a
+<style> block through st.markdown on every rerun, but:
+
+- each stylesheet lives once in styles/ instead of being pasted into both the
+  legacy script and its pages/ copy;
+- the block is built once per process (re-read only when the file changes)
+  and minified, so a rerun sends fewer bytes and no indentation or comments.
+
+Run `python page_styles.py` to compare the per-rerun payload of the source
+files with the blocks the pages send.
+
+This module must stay importable without Streamlit.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+STYLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "styles")
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_SPACE = re.compile(r"\s+")
+_AROUND_PUNCTUATION = re.compile(r"\s*([{};])\s*")
+
+
+def minify(css):
+    """Drop comments and the whitespace CSS doesn't need; string contents keep their single spaces."""
+    css = _SPACE.sub(" ", _COMMENT.sub("", css))
+    return _AROUND_PUNCTUATION.sub(r"\1", css).strip()
+
+
+@lru_cache(maxsize=None)
+def _minified(path, mtime):
+    with open(path, encoding="utf-8") as f:
+        return minify(f.read())
+
+
+def inline_styles(*names):
+    """One <style> block with the stylesheets in styles/, in order, for st.markdown(..., unsafe_allow_html=True)."""
+    paths = [os.path.join(STYLES_DIR, name) for name in names]
+    return "<style>" + "".join(_minified(path, os.path.getmtime(path)) for path in paths) + "</style>"
+
+
+def payload_report():
+    """(stylesheet, source bytes, inline block bytes) for each stylesheet in styles/."""
+    report = []
+    for name in sorted(os.listdir(STYLES_DIR)):
+        if name.endswith(".css"):
+            source = os.path.getsize(os.path.join(STYLES_DIR, name))
+            report.append((name, source, len(inline_styles(name).encode("utf-8"))))
+    return report
+
+
+if __name__ == "__main__":
+    print(f"{'stylesheet':<28}{'source (bytes)':>16}{'<style> (bytes/rerun)':>24}")
+    for name, source, inline in payload_report():
+        print(f"{name:<28}{source:>16}{inline:>24}")
@@ -9,11 +9,20 @@ Set your API key: export ANTHROPIC_API_KEY=your-key-here
 
 import streamlit as st
 import anthropic
-import random
 import math
 import os
-from datetime import datetime, date
-from teachings import TEACHINGS, THEMES, filter_teachings, get_philosophers, get_traditions, generate_teaching_from_llm
+import time
+import uuid
+from teachings import TEACHINGS, THEMES, get_teaching_store, get_philosophers, get_traditions, daily_teaching, random_teaching, count_teachings, search_teachings, generate_teaching_from_llm
+from contemplation import get_contemplation, stream_contemplation as stream_contemplation_chunks
+from llm_client import warm_connection
+from prefetch import prefetch_contemplation, claim_prefetched_contemplation, cancel_prefetch, prefetch_stats
+from prewarm import start_prewarm_scheduler
+from rate_limit import session_scope
+from rerun_timing import record, timed, timing_report
+from teaching_pool import take_pooled_teaching
+from similarity import SimilarityIndex
+from page_styles import inline_styles
 from dotenv import load_dotenv
 
 load_dotenv()  # Load environment variables from .env file
@@ -21,6 +30,19 @@ load_dotenv()  # Load environment variables from .env file
 # Get API key from environment
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 
+# Stream contemplations paragraph by paragraph (set STREAM_CONTEMPLATIONS=0 to wait for the full text)
+STREAM_CONTEMPLATIONS = os.environ.get("STREAM_CONTEMPLATIONS", "1") != "0"
+
+# Each tab reruns on its own when its widgets are used; SIT_FRAGMENTS=0 reruns the whole page
+# instead (to compare rerun timings, see rerun_timing)
+USE_FRAGMENTS = os.environ.get("SIT_FRAGMENTS", "1") != "0"
+tab_fragment = st.fragment if USE_FRAGMENTS else (lambda view: view)
+
+SEARCH_PAGE_SIZE = 5
+SIMILAR_COUNT = 5
+
+run_started = time.perf_counter()
+
 # ─────────────────────────────────────────────
 # CONFIG
 # ─────────────────────────────────────────────
@@ -36,227 +58,7 @@ st.set_page_config(
 # CUSTOM CSS
 # ─────────────────────────────────────────────
 
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Newsreader:ital,wght@0,300;0,400;0,500;1,300;1,400&family=DM+Sans:wght@300;400;500;600&display=swap');
-
-    /* Global */
-    .stApp {
-        background-color: #08080c;
-        color: #d8d4ce;
-    }
-
-    /* Hide streamlit chrome */
-    #MainMenu, footer, header { visibility: hidden; }
-    .block-container { padding-top: 2rem; max-width: 960px; }
-
-    /* Typography */
-    h1, h2, h3 {
-        font-family: 'Newsreader', Georgia, serif !important;
-        color: #ece8e0 !important;
-        font-weight: 300 !important;
-    }
-    p, li, span, div {
-        font-family: 'DM Sans', sans-serif;
-    }
-
-    /* Teaching card */
-    .teaching-card {
-        background: #0e0e12;
-        border: 1px solid #1a1816;
-        border-radius: 20px;
-        padding: 44px 40px;
-        margin: 20px 0;
-        position: relative;
-        overflow: hidden;
-    }
-    .teaching-card::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 40px;
-        right: 40px;
-        height: 1px;
-        background: linear-gradient(90deg, transparent, rgba(200,170,130,0.2), transparent);
-    }
-
-    /* Teaching text */
-    .teaching-text {
-        font-family: 'Newsreader', Georgia, serif;
-        font-size: 1.5rem;
-        line-height: 1.65;
-        color: #e8e4de;
-        font-weight: 300;
-        font-style: italic;
-        margin: 24px 0 28px;
-    }
-
-    /* Philosopher info */
-    .philosopher-name {
-        font-family: 'Newsreader', Georgia, serif;
-        font-size: 1.05rem;
-        color: #c9c0b8;
-        font-weight: 400;
-    }
-    .philosopher-meta {
-        font-family: 'DM Sans', sans-serif;
-        font-size: 0.75rem;
-        color: #fff;
-        letter-spacing: 0.02em;
-    }
-
-    /* Tradition tag */
-    .tradition-tag {
-        display: inline-block;
-        padding: 4px 14px;
-        border-radius: 100px;
-        font-size: 0.7rem;
-        font-family: 'DM Sans', sans-serif;
-        letter-spacing: 0.1em;
-        text-transform: uppercase;
-    }
-
-    /* Contemplation box */
-    .contemplation-box {
-        background: #0c0c10;
-        border: 1px solid #1a1816;
-        border-radius: 20px;
-        padding: 36px 40px;
-        margin-top: 24px;
-    }
-    .contemplation-label {
-        font-size: 0.7rem;
-        letter-spacing: 0.2em;
-        text-transform: uppercase;
-        color: #fff;
-        font-family: 'DM Sans', sans-serif;
-        margin-bottom: 16px;
-    }
-    .contemplation-text {
-        font-family: 'Newsreader', Georgia, serif;
-        font-size: 1.02rem;
-        line-height: 1.85;
-        color: #a8a098;
-        font-weight: 300;
-    }
-    .contemplation-text p {
-        font-family: 'Newsreader', Georgia, serif !important;
-        margin-bottom: 14px;
-    }
-
-    /* Streamlit button overrides */
-    .stButton > button {
-        border-radius: 100px !important;
-        font-family: 'DM Sans', sans-serif !important;
-        font-weight: 500 !important;
-        letter-spacing: 0.02em !important;
-        transition: all 0.3s !important;
-        white-space: nowrap !important;
-    }
-
-    /* Primary button */
-    .stButton > button[kind="primary"],
-    div[data-testid="stButton"] > button[kind="primary"] {
-        background: linear-gradient(135deg, #8a6840, #6a5030) !important;
-        color: #f0ece6 !important;
-        border: none !important;
-        padding: 12px 24px !important;
-        min-width: 180px !important;
-        box-shadow: 0 4px 20px rgba(138,104,64,0.2) !important;
-    }
-
-    /* Secondary button */
-    .stButton > button[kind="secondary"],
-    div[data-testid="stButton"] > button[kind="secondary"] {
-        background: transparent !important;
-        border: 1px solid #2a2520 !important;
-        color: #7a7570 !important;
-        padding: 12px 24px !important;
-        min-width: 180px !important;
-    }
-
-    /* Button container spacing */
-    div[data-testid="stButton"] {
-        margin: 8px 0 !important;
-    }
-
-    /* Column gap fix */
-    div[data-testid="column"] {
-        padding: 0 8px !important;
-    }
-    div[data-testid="column"]:first-child {
-        padding-left: 0 !important;
-    }
-    div[data-testid="column"]:last-child {
-        padding-right: 0 !important;
-    }
-
-    /* Radio/selectbox overrides */
-    .stRadio > div { flex-direction: row !important; gap: 8px; flex-wrap: wrap; }
-    .stRadio > div > label {
-        background: transparent !important;
-        border: 1px solid #1e1c18 !important;
-        border-radius: 100px !important;
-        padding: 6px 16px !important;
-        color: #4a4540 !important;
-        font-size: 0.78rem !important;
-        font-family: 'DM Sans', sans-serif !important;
-    }
-    .stRadio > div > label[data-checked="true"],
-    .stRadio > div > label:has(input:checked) {
-        border-color: #6a6050 !important;
-        background: rgba(106,96,80,0.1) !important;
-        color: #c9b8a0 !important;
-    }
-
-    /* Tabs */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 8px;
-        justify-content: center;
-        border-bottom: none;
-    }
-    .stTabs [data-baseweb="tab"] {
-        border-radius: 100px;
-        border: 1px solid #2a2520;
-        background: transparent;
-        color: #fff;
-        padding: 8px 22px;
-        font-family: 'DM Sans', sans-serif;
-        font-size: 0.82rem;
-    }
-    .stTabs [aria-selected="true"] {
-        background: rgba(138,117,96,0.12) !important;
-        border-color: #8a7560 !important;
-        color: #c9b8a0 !important;
-    }
-    .stTabs [data-baseweb="tab-highlight"] { display: none; }
-    .stTabs [data-baseweb="tab-border"] { display: none; }
-
-    /* Divider */
-    hr { border-color: #141210 !important; }
-
-    /* Sidebar */
-    section[data-testid="stSidebar"] {
-        background: #f1f1f9;
-        border-right: 1px solid #1a1816;
-    }
-
-    /* Spinner */
-    .stSpinner > div { border-top-color: #8a6840 !important; }
-
-    /* Footer */
-    .app-footer {
-        text-align: center;
-        margin-top: 48px;
-        padding-top: 24px;
-        border-top: 1px solid #141210;
-        font-size: 0.72rem;
-        color: #3a3530;
-        font-family: 'DM Sans', sans-serif;
-        letter-spacing: 0.05em;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(inline_styles("sit_with_this.css", "sit_with_this_suite.css"), unsafe_allow_html=True)
 
 # ─────────────────────────────────────────────
 # STATE
@@ -268,25 +70,16 @@ if "contemplation" not in st.session_state:
     st.session_state.contemplation = None
 if "contemplation_loading" not in st.session_state:
     st.session_state.contemplation_loading = False
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if "sit_view" not in st.session_state:
+    st.session_state.sit_view = "daily"
 
 
 # ─────────────────────────────────────────────
 # HELPERS
 # ─────────────────────────────────────────────
 
-def get_daily_teaching(teachings_list):
-    """Deterministic daily pick based on date."""
-    today = date.today()
-    day_of_year = today.timetuple().tm_yday
-    index = day_of_year % len(teachings_list)
-    return teachings_list[index]
-
-
-def get_random_teaching(teachings_list):
-    """Random pick from filtered list."""
-    return random.choice(teachings_list)
-
-
 TRADITION_COLORS = {
     "Indian": "#e8c9a0",
     "Sufi": "#c9a0e8",
@@ -299,35 +92,13 @@ TRADITION_COLORS = {
 
 
 def generate_contemplation(teaching):
-    """Call Claude API to generate a contemplation for the teaching."""
+    """Return a contemplation for the teaching, served from the cache when possible."""
     api_key = st.session_state.get("api_key", ANTHROPIC_API_KEY)
     if not api_key:
         return "⚠️ Please enter your Anthropic API key in the sidebar to generate contemplations."
 
     try:
-        client = anthropic.Anthropic(api_key=api_key)
-        theme_label = THEMES.get(teaching["theme"], {}).get("label", teaching["theme"])
-
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1024,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"""You are a contemplative guide helping someone sit with a philosophical teaching for the day. The teaching is from {teaching['philosopher']} ({teaching['tradition']} tradition), on the theme of "{theme_label}":
-
-"{teaching['teaching']}"
-
-Write a brief contemplation (3-5 short paragraphs) that:
-1. Unpacks the core insight in simple, accessible language — what is the philosopher actually pointing at?
-2. Offers a practical way to notice this in daily life today — a specific observation or micro-practice
-3. Ends with a single question to sit with, not to answer but to carry through the day
-
-Keep the tone warm, personal, and grounded — like a wise friend speaking over morning tea. No bullet points. No academic language. Write as if speaking to someone who thinks deeply but wants to feel, not just understand."""
-                }
-            ]
-        )
-        return message.content[0].text
+        return get_contemplation(teaching, api_key)
     except anthropic.AuthenticationError:
         return "⚠️ Invalid API key. Please check your key in the sidebar."
     except Exception as e:
@@ -363,10 +134,10 @@ def render_teaching_card(teaching):
     """, unsafe_allow_html=True)
 
 
-def render_contemplation(text):
+def render_contemplation(text, container=None):
     """Render the contemplation in a styled box."""
     paragraphs = "".join(f"<p>{p.strip()}</p>" for p in text.split("\n") if p.strip())
-    st.markdown(f"""
+    (container or st).markdown(f"""
     <div class="contemplation-box">
         <div class="contemplation-label">○ Contemplation</div>
         <div class="contemplation-text">
@@ -376,6 +147,137 @@ def render_contemplation(text):
     """, unsafe_allow_html=True)
 
 
+def stream_contemplation(teaching):
+    """Stream the contemplation into the page paragraph by paragraph and return the full text."""
+    api_key = st.session_state.get("api_key", ANTHROPIC_API_KEY)
+    if not api_key:
+        return "⚠️ Please enter your Anthropic API key in the sidebar to generate contemplations."
+
+    placeholder = st.empty()
+    render_contemplation("", placeholder)
+    text = ""
+    shown = 0
+    try:
+        for chunk in stream_contemplation_chunks(teaching, api_key):
+            text += chunk
+            # Only draw whole paragraphs so half-written sentences don't flicker
+            complete = text.rfind("\n")
+            if complete > shown:
+                render_contemplation(text[:complete], placeholder)
+                shown = complete
+    except anthropic.AuthenticationError:
+        text = "⚠️ Invalid API key. Please check your key in the sidebar."
+    except Exception as e:
+        text = f"⚠️ Could not generate contemplation: {str(e)}"
+    placeholder.empty()
+    return text
+
+
+@st.cache_resource(show_spinner=False)
+def get_similarity_index():
+    """TF-IDF matrix over the corpus, built once per process."""
+    return SimilarityIndex(get_teaching_store())
+
+
+def render_more_like_this(teaching, key):
+    """'More like this' button under a teaching card, listing its nearest teachings."""
+    state_key = f"similar_{key}"
+    if st.button("≈ More Like This", key=f"similar_btn_{key}", type="secondary"):
+        st.session_state[state_key] = (teaching["teaching"], get_similarity_index().similar(teaching, k=SIMILAR_COUNT))
+
+    shown = st.session_state.get(state_key)
+    if not shown or shown[0] != teaching["teaching"]:
+        return
+    for similar in shown[1]:
+        trad_color = TRADITION_COLORS.get(similar["tradition"], "#e8c9a0")
+        st.markdown(f"""
+        <div style="border-left: 2px solid {trad_color}40; padding: 6px 0 6px 16px; margin: 10px 0;">
+            <div style="font-family: 'Newsreader', Georgia, serif; font-style: italic; font-size: 1.02rem; line-height: 1.6; color: #c9c0b8;">
+                "{similar['teaching']}"
+            </div>
+            <div class="philosopher-meta" style="margin-top: 4px;">— {similar['philosopher']} · {similar['tradition']}</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+
+def set_search_page(page):
+    st.session_state.explore_search_page = page
+
+
+def open_search_result(teaching):
+    """Make a search hit the Explore tab's current teaching and leave search."""
+    st.session_state.explore_teaching = teaching
+    st.session_state.explore_contemplation = None
+    st.session_state.explore_query = ""
+    st.session_state.explore_search_page = 0
+
+
+def render_search_results(query, theme):
+    """Render one page of ranked search results for the Explore tab."""
+    page = st.session_state.get("explore_search_page", 0)
+    results = search_teachings(query, theme=theme, page=page, per_page=SEARCH_PAGE_SIZE)
+    if not results.total:
+        st.info("No teachings match that search.")
+        return
+
+    page_count = math.ceil(results.total / SEARCH_PAGE_SIZE)
+    st.markdown(f"""
+    <div style="font-size: 0.75rem; color: #6a6560; text-align: center; margin-top: 8px;">
+        {results.total} matching teachings · page {page + 1} of {page_count}
+    </div>
+    """, unsafe_allow_html=True)
+
+    for i, teaching in enumerate(results.hits):
+        render_teaching_card(teaching)
+        st.button("✧ Sit With This One", key=f"search_open_{page}_{i}", type="secondary",
+                  on_click=open_search_result, args=(teaching,))
+
+    col_prev, col_gap, col_next = st.columns([1, 1, 1])
+    with col_prev:
+        st.button("← Previous", key="search_prev", type="secondary", use_container_width=True,
+                  disabled=page == 0, on_click=set_search_page, args=(page - 1,))
+    with col_next:
+        st.button("Next →", key="search_next", type="secondary", use_container_width=True,
+                  disabled=page + 1 >= page_count, on_click=set_search_page, args=(page + 1,))
+
+
+def llm_session():
+    """Rate-limit calls made in the block against this session, showing its place in the queue if it has to wait."""
+    notice = st.empty()
+
+    def on_wait(position):
+        if position:
+            notice.caption(f"Many people are sitting right now. You are #{position} in line...")
+        else:
+            notice.empty()
+
+    return session_scope(st.session_state.session_id, on_wait)
+
+
+def contemplate(teaching):
+    """Produce a contemplation for the teaching, streaming it onto the page when enabled."""
+    with st.spinner("Contemplating..."):
+        prefetched = claim_prefetched_contemplation(teaching, st.session_state.session_id)
+    if prefetched is not None:
+        return prefetched
+    with llm_session():
+        if STREAM_CONTEMPLATIONS:
+            return stream_contemplation(teaching)
+        with st.spinner("Contemplating..."):
+            return generate_contemplation(teaching)
+
+
+def next_generated_teaching(api_key, **selectors):
+    """Pop a pre-generated teaching for the selectors, falling back to a live call on api_key when the pool is empty."""
+    teaching = take_pooled_teaching(**selectors)
+    if teaching is None:
+        with llm_session():
+            generated = generate_teaching_from_llm(api_key=api_key, count=1,
+                                                   nonce=st.session_state.get("generation_count", 0), **selectors)
+        teaching = generated[0] if generated else None
+    return teaching
+
+
 # ─────────────────────────────────────────────
 # SIDEBAR
 # ─────────────────────────────────────────────
@@ -393,6 +295,14 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
 
+    stats = prefetch_stats()
+    if stats["issued"]:
+        st.caption(f"Prefetch: {stats['hits']} hits · {stats['wasted']} wasted · {stats['cancelled']} cancelled of {stats['issued']}")
+
+    timings = timing_report()
+    if timings:
+        st.caption("Reruns (p50): " + " · ".join(f"{scope} {t['p50_ms']:.0f} ms" for scope, t in sorted(timings.items())))
+
     st.markdown("---")
     st.markdown("""
     <div style="font-size: 0.72rem; color: #3a3530; line-height: 1.6;">
@@ -403,6 +313,25 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 
+@st.cache_resource(show_spinner=False)
+def warm_llm_connection(api_key):
+    """Open the pooled API connection once per process and key while the page renders."""
+    warm_connection(api_key)
+
+
+@st.cache_resource(show_spinner=False)
+def prewarm_daily_contemplations(api_key):
+    """Start the midnight pre-warm scheduler once per server process."""
+    start_prewarm_scheduler(api_key)
+
+
+if ANTHROPIC_API_KEY:
+    prewarm_daily_contemplations(ANTHROPIC_API_KEY)
+
+if st.session_state.get("api_key", ANTHROPIC_API_KEY):
+    warm_llm_connection(st.session_state.get("api_key", ANTHROPIC_API_KEY))
+
+
 # ─────────────────────────────────────────────
 # HEADER
 # ─────────────────────────────────────────────
@@ -428,93 +357,111 @@ st.markdown("""
 # MODE TABS
 # ─────────────────────────────────────────────
 
-tab_daily, tab_explore, tab_generate = st.tabs(["Today's Teaching", "Explore", "✨ Generate New"])
+# Only the active view's body runs (see ACTIVE VIEW below); st.tabs would build all three on every run
+VIEW_LABELS = {"daily": "Today's Teaching", "explore": "Explore", "generate": "✨ Generate New"}
+
+
+def select_view():
+    """on_change for the view picker; clicking the active view again keeps it rather than deselecting it."""
+    if st.session_state.view_picker is None:
+        st.session_state.view_picker = st.session_state.sit_view
+    else:
+        st.session_state.sit_view = st.session_state.view_picker
+
+
+st.session_state.setdefault("view_picker", st.session_state.sit_view)
+st.segmented_control(
+    "View",
+    list(VIEW_LABELS),
+    format_func=VIEW_LABELS.get,
+    key="view_picker",
+    on_change=select_view,
+    label_visibility="collapsed",
+)
 
 
 # ─────────────────────────────────────────────
 # THEME SELECTOR (shared)
 # ─────────────────────────────────────────────
 
+def select_theme(key_suffix, theme):
+    """on_click for a theme pill: switch the tab's theme and clear what that tab showed for the old one."""
+    st.session_state[f"theme_{key_suffix}"] = theme
+    if key_suffix == "daily":
+        st.session_state.contemplation = None
+    else:
+        st.session_state.explore_contemplation = None
+        st.session_state.explore_search_page = 0
+        st.session_state.pop("explore_teaching", None)
+
+
 def theme_selector(key_suffix):
     """Render theme pill selector."""
     theme_options = list(THEMES.keys())
-    theme_labels = [f"{v['icon']} {v['label']}" for v in THEMES.values()]
     selected = st.session_state.get(f"theme_{key_suffix}", "all")
 
-    # Split into 2 rows: 4 buttons in first row, 3 in second row
-    # Row 1: First 4 themes
-    cols1 = st.columns(4)
-    for i in range(min(4, len(theme_options))):
-        key = theme_options[i]
-        label = theme_labels[i]
-        with cols1[i]:
-            if st.button(
-                label,
-                key=f"theme_btn_{key}_{key_suffix}",
-                use_container_width=True,
-                type="primary" if selected == key else "secondary",
-            ):
-                st.session_state[f"theme_{key_suffix}"] = key
-                # Clear all contemplations and teachings when theme changes
-                st.session_state.contemplation = None
-                st.session_state.explore_contemplation = None
-                st.session_state.generated_contemplation = None
-                if "explore_teaching" in st.session_state:
-                    del st.session_state.explore_teaching
-                st.rerun()
-
-    # Row 2: Remaining themes
-    if len(theme_options) > 4:
-        st.markdown("<div style='margin-top: 8px;'></div>", unsafe_allow_html=True)
-        remaining = len(theme_options) - 4
-        cols2 = st.columns(remaining)
-        for i in range(remaining):
-            idx = i + 4
-            key = theme_options[idx]
-            label = theme_labels[idx]
-            with cols2[i]:
-                if st.button(
-                    label,
+    # Split into 2 rows: 4 buttons in first row, the rest in the second
+    for row, keys in enumerate((theme_options[:4], theme_options[4:])):
+        if not keys:
+            continue
+        if row:
+            st.markdown("<div style='margin-top: 8px;'></div>", unsafe_allow_html=True)
+        for col, key in zip(st.columns(len(keys)), keys):
+            with col:
+                st.button(
+                    f"{THEMES[key]['icon']} {THEMES[key]['label']}",
                     key=f"theme_btn_{key}_{key_suffix}",
                     use_container_width=True,
                     type="primary" if selected == key else "secondary",
-                ):
-                    st.session_state[f"theme_{key_suffix}"] = key
-                    # Clear all contemplations and teachings when theme changes
-                    st.session_state.contemplation = None
-                    st.session_state.explore_contemplation = None
-                    st.session_state.generated_contemplation = None
-                    if "explore_teaching" in st.session_state:
-                        del st.session_state.explore_teaching
-                    st.rerun()
+                    on_click=select_theme,
+                    args=(key_suffix, key),
+                )
 
     return selected
 
 
+def next_explore_teaching():
+    """on_click for "Another Teaching": move on to the teaching pre-chosen for Explore."""
+    # The teaching being left behind no longer needs its prefetched contemplation
+    cancel_prefetch(st.session_state.explore_teaching, st.session_state.session_id)
+    st.session_state.explore_teaching = st.session_state.pop("explore_next")[1]
+    st.session_state.explore_contemplation = None
+
+
+def request_generation():
+    """on_click for the Generate buttons: generate a teaching on this run, below the options."""
+    st.session_state.generate_requested = True
+    # Each click asks for a new teaching, so it must not be answered with the last click's
+    st.session_state.generation_count = st.session_state.get("generation_count", 0) + 1
+
+
 # ─────────────────────────────────────────────
 # TODAY'S TEACHING
 # ─────────────────────────────────────────────
 
-with tab_daily:
-    st.markdown("")
-    theme = theme_selector("daily")
-    filtered = filter_teachings(theme=theme)
+@tab_fragment
+def daily_view():
+    with timed("daily tab"):
+        st.markdown("")
+        theme = theme_selector("daily")
+        teaching = daily_teaching(theme)
+
+        if teaching is None:
+            st.warning("No teachings found for this theme.")
+            return
 
-    if not filtered:
-        st.warning("No teachings found for this theme.")
-    else:
-        teaching = get_daily_teaching(filtered)
         st.session_state.current_teaching = teaching
         render_teaching_card(teaching)
+        render_more_like_this(teaching, "daily")
 
         # Contemplation button
         st.markdown("<div style='margin-top: 32px;'></div>", unsafe_allow_html=True)
         col1, col2, col3 = st.columns([1, 1, 1])
         with col2:
-            if st.button("✧ Help Me Sit With This", key="contemplate_daily", type="primary", use_container_width=True):
-                with st.spinner("Contemplating..."):
-                    result = generate_contemplation(teaching)
-                    st.session_state.contemplation = result
+            contemplate_clicked = st.button("✧ Help Me Sit With This", key="contemplate_daily", type="primary", use_container_width=True)
+
+        if contemplate_clicked:
+            st.session_state.contemplation = contemplate(teaching)
 
         if st.session_state.contemplation:
             render_contemplation(st.session_state.contemplation)
@@ -524,35 +471,57 @@ with tab_daily:
 # EXPLORE
 # ─────────────────────────────────────────────
 
-with tab_explore:
-    st.markdown("")
-    theme = theme_selector("explore")
-    filtered = filter_teachings(theme=theme)
+@tab_fragment
+def explore_view():
+    with timed("explore tab"):
+        st.markdown("")
+        theme = theme_selector("explore")
+        query = st.text_input(
+            "Search teachings",
+            key="explore_query",
+            placeholder="Search teachings — a word, a phrase, a philosopher…",
+            label_visibility="collapsed",
+            on_change=set_search_page,
+            args=(0,),
+        )
+
+        if query.strip():
+            render_search_results(query, theme)
+            return
+        if not count_teachings(theme):
+            st.warning("No teachings found for this theme.")
+            return
 
-    if not filtered:
-        st.warning("No teachings found for this theme.")
-    else:
         # Initialize or get teaching for explore mode
         if "explore_teaching" not in st.session_state:
-            st.session_state.explore_teaching = get_random_teaching(filtered)
+            st.session_state.explore_teaching = random_teaching(theme)
             st.session_state.explore_contemplation = None
 
+        # Pre-choose the next teaching and start its contemplation in the background
+        upcoming = st.session_state.get("explore_next")
+        if upcoming is None or upcoming[0] != theme:
+            if upcoming is not None:
+                cancel_prefetch(upcoming[1], st.session_state.session_id)
+            upcoming = st.session_state.explore_next = (theme, random_teaching(theme))
+            api_key = st.session_state.get("api_key", ANTHROPIC_API_KEY)
+            if api_key:
+                prefetch_contemplation(upcoming[1], api_key, st.session_state.session_id)
+
         render_teaching_card(st.session_state.explore_teaching)
+        render_more_like_this(st.session_state.explore_teaching, "explore")
 
         # Buttons
         st.markdown("<div style='margin-top: 16px;'></div>", unsafe_allow_html=True)
         col1, col_gap, col2 = st.columns([1, 1, 1])
         with col1:
-            if st.button("✧ Help Me Sit With This", key="contemplate_explore", type="primary", use_container_width=True):
-                with st.spinner("Contemplating..."):
-                    result = generate_contemplation(st.session_state.explore_teaching)
-                    st.session_state.explore_contemplation = result
+            contemplate_clicked = st.button("✧ Help Me Sit With This", key="contemplate_explore", type="primary", use_container_width=True)
 
         with col2:
-            if st.button("↻ Another Teaching", key="next_explore", type="secondary", use_container_width=True):
-                st.session_state.explore_teaching = get_random_teaching(filtered)
-                st.session_state.explore_contemplation = None
-                st.rerun()
+            st.button("↻ Another Teaching", key="next_explore", type="secondary", use_container_width=True,
+                      on_click=next_explore_teaching)
+
+        if contemplate_clicked:
+            st.session_state.explore_contemplation = contemplate(st.session_state.explore_teaching)
 
         if st.session_state.get("explore_contemplation"):
             render_contemplation(st.session_state.explore_contemplation)
@@ -562,57 +531,63 @@ with tab_explore:
 # GENERATE NEW (AI-POWERED)
 # ─────────────────────────────────────────────
 
-with tab_generate:
-    st.markdown("")
-    st.markdown("""
-    <div style="text-align: center; margin-bottom: 24px;">
-        <div style="font-size: 0.82rem; color: #8a7a6a; line-height: 1.7; max-width: 500px; margin: 0 auto;">
-            Generate new teachings using AI based on your preferences.
-            These supplement the curated collection with fresh insights.
+@tab_fragment
+def generate_view():
+    with timed("generate tab"):
+        st.markdown("")
+        st.markdown("""
+        <div style="text-align: center; margin-bottom: 24px;">
+            <div style="font-size: 0.82rem; color: #8a7a6a; line-height: 1.7; max-width: 500px; margin: 0 auto;">
+                Generate new teachings using AI based on your preferences.
+                These supplement the curated collection with fresh insights.
+            </div>
         </div>
-    </div>
-    """, unsafe_allow_html=True)
-
-    # Generation options
-    col1, col2, col3 = st.columns(3)
-
-    with col1:
-        st.markdown("<div style='font-size: 0.75rem; color: #6a6560; margin-bottom: 8px;'>PHILOSOPHER</div>", unsafe_allow_html=True)
-        philosopher_options = ["Any"] + get_philosophers()
-        selected_philosopher = st.selectbox(
-            "Philosopher",
-            philosopher_options,
-            key="gen_philosopher",
-            label_visibility="collapsed"
-        )
+        """, unsafe_allow_html=True)
 
-    with col2:
-        st.markdown("<div style='font-size: 0.75rem; color: #6a6560; margin-bottom: 8px;'>THEME</div>", unsafe_allow_html=True)
-        theme_options = [("all", "Any Theme")] + [(k, v["label"]) for k, v in THEMES.items() if k != "all"]
-        selected_theme = st.selectbox(
-            "Theme",
-            [t[0] for t in theme_options],
-            format_func=lambda x: next(t[1] for t in theme_options if t[0] == x),
-            key="gen_theme",
-            label_visibility="collapsed"
-        )
+        # Generation options
+        col1, col2, col3 = st.columns(3)
 
-    with col3:
-        st.markdown("<div style='font-size: 0.75rem; color: #6a6560; margin-bottom: 8px;'>TRADITION</div>", unsafe_allow_html=True)
-        tradition_options = ["Any"] + get_traditions()
-        selected_tradition = st.selectbox(
-            "Tradition",
-            tradition_options,
-            key="gen_tradition",
-            label_visibility="collapsed"
-        )
+        with col1:
+            st.markdown("<div style='font-size: 0.75rem; color: #6a6560; margin-bottom: 8px;'>PHILOSOPHER</div>", unsafe_allow_html=True)
+            philosopher_options = ["Any"] + get_philosophers()
+            selected_philosopher = st.selectbox(
+                "Philosopher",
+                philosopher_options,
+                key="gen_philosopher",
+                label_visibility="collapsed"
+            )
 
-    st.markdown("")
+        with col2:
+            st.markdown("<div style='font-size: 0.75rem; color: #6a6560; margin-bottom: 8px;'>THEME</div>", unsafe_allow_html=True)
+            theme_options = [("all", "Any Theme")] + [(k, v["label"]) for k, v in THEMES.items() if k != "all"]
+            selected_theme = st.selectbox(
+                "Theme",
+                [t[0] for t in theme_options],
+                format_func=lambda x: next(t[1] for t in theme_options if t[0] == x),
+                key="gen_theme",
+                label_visibility="collapsed"
+            )
+
+        with col3:
+            st.markdown("<div style='font-size: 0.75rem; color: #6a6560; margin-bottom: 8px;'>TRADITION</div>", unsafe_allow_html=True)
+            tradition_options = ["Any"] + get_traditions()
+            selected_tradition = st.selectbox(
+                "Tradition",
+                tradition_options,
+                key="gen_tradition",
+                label_visibility="collapsed"
+            )
+
+        st.markdown("")
+
+        # Generate button
+        col1, col2, col3 = st.columns([1, 1, 1])
+        with col2:
+            st.button("✨ Generate Teaching", key="generate_btn", type="primary", use_container_width=True,
+                      on_click=request_generation)
 
-    # Generate button
-    col1, col2, col3 = st.columns([1, 1, 1])
-    with col2:
-        if st.button("✨ Generate Teaching", key="generate_btn", type="primary", use_container_width=True):
+        # Both Generate buttons land here, so the new teaching is drawn on the same run
+        if st.session_state.pop("generate_requested", False):
             api_key = st.session_state.get("api_key", ANTHROPIC_API_KEY)
             if not api_key:
                 st.error("⚠️ Please enter your Anthropic API key in the sidebar to generate new teachings.")
@@ -620,10 +595,7 @@ with tab_generate:
                 with st.spinner("Generating new teaching..."):
                     try:
                         # Prepare parameters
-                        gen_params = {
-                            "api_key": api_key,
-                            "count": 1
-                        }
+                        gen_params = {}
 
                         if selected_philosopher != "Any":
                             gen_params["philosopher"] = selected_philosopher
@@ -634,13 +606,12 @@ with tab_generate:
                         if selected_tradition != "Any":
                             gen_params["tradition"] = selected_tradition
 
-                        # Generate teaching
-                        generated = generate_teaching_from_llm(**gen_params)
+                        # Generate teaching (served from the pre-generated pool when possible)
+                        generated = next_generated_teaching(api_key, **gen_params)
 
-                        if generated and len(generated) > 0:
-                            st.session_state.generated_teaching = generated[0]
+                        if generated:
+                            st.session_state.generated_teaching = generated
                             st.session_state.generated_contemplation = None
-                            st.rerun()
                         else:
                             st.error("Failed to generate teaching. Please try again.")
 
@@ -651,47 +622,34 @@ with tab_generate:
                     except Exception as e:
                         st.error(f"⚠️ Unexpected error: {str(e)}")
 
-    # Display generated teaching
-    if "generated_teaching" in st.session_state and st.session_state.generated_teaching:
-        teaching = st.session_state.generated_teaching
-        render_teaching_card(teaching)
+        # Display generated teaching
+        if "generated_teaching" in st.session_state and st.session_state.generated_teaching:
+            teaching = st.session_state.generated_teaching
+            render_teaching_card(teaching)
 
-        # Contemplation and regenerate buttons
-        st.markdown("<div style='margin-top: 32px;'></div>", unsafe_allow_html=True)
-        col1, col_gap, col2 = st.columns([1, 1, 1])
-        with col1:
-            if st.button("✧ Help Me Sit With This", key="contemplate_generated", type="primary", use_container_width=True):
-                with st.spinner("Contemplating..."):
-                    result = generate_contemplation(teaching)
-                    st.session_state.generated_contemplation = result
+            # Contemplation and regenerate buttons
+            st.markdown("<div style='margin-top: 32px;'></div>", unsafe_allow_html=True)
+            col1, col_gap, col2 = st.columns([1, 1, 1])
+            with col1:
+                contemplate_clicked = st.button("✧ Help Me Sit With This", key="contemplate_generated", type="primary", use_container_width=True)
 
-        with col2:
-            if st.button("✨ Generate Another", key="regenerate", type="secondary", use_container_width=True):
-                api_key = st.session_state.get("api_key", ANTHROPIC_API_KEY)
-                if not api_key:
-                    st.error("⚠️ Please enter your Anthropic API key in the sidebar.")
-                else:
-                    with st.spinner("Generating new teaching..."):
-                        try:
-                            gen_params = {"api_key": api_key, "count": 1}
-
-                            if selected_philosopher != "Any":
-                                gen_params["philosopher"] = selected_philosopher
-                            if selected_theme != "all":
-                                gen_params["theme"] = selected_theme
-                            if selected_tradition != "Any":
-                                gen_params["tradition"] = selected_tradition
-
-                            generated = generate_teaching_from_llm(**gen_params)
-                            if generated and len(generated) > 0:
-                                st.session_state.generated_teaching = generated[0]
-                                st.session_state.generated_contemplation = None
-                                st.rerun()
-                        except Exception as e:
-                            st.error(f"⚠️ {str(e)}")
-
-        if st.session_state.get("generated_contemplation"):
-            render_contemplation(st.session_state.generated_contemplation)
+            with col2:
+                st.button("✨ Generate Another", key="regenerate", type="secondary", use_container_width=True,
+                          on_click=request_generation)
+
+            if contemplate_clicked:
+                st.session_state.generated_contemplation = contemplate(teaching)
+
+            if st.session_state.get("generated_contemplation"):
+                render_contemplation(st.session_state.generated_contemplation)
+
+
+# ─────────────────────────────────────────────
+# ACTIVE VIEW
+# ─────────────────────────────────────────────
+
+VIEWS = {"daily": daily_view, "explore": explore_view, "generate": generate_view}
+VIEWS[st.session_state.sit_view]()
 
 
 # ─────────────────────────────────────────────
@@ -703,3 +661,5 @@ st.markdown(f"""
     {len(TEACHINGS)} teachings · {len(get_philosophers())} philosophers · {len(get_traditions())} traditions · {len(THEMES) - 1} themes
 </div>
 """, unsafe_allow_html=True)
+
+record("full page", time.perf_counter() - run_started)
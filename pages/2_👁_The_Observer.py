@@ -1,15 +1,27 @@
+import hashlib
 import os
+import uuid
 
 import streamlit as st
-import anthropic
-import json
 from dotenv import load_dotenv
+from llm_client import get_client, warm_connection
+from model_router import RoutedStream, is_model, primary_model, routed_create
+from call_policy import get_policy, is_unavailable
+from incremental_json import ObjectStreamParser
+from observer_cache import ObserverCache
+from rate_limit import estimate_tokens, session_scope
+from singleflight import get_flights, request_key
+from page_styles import inline_styles
+from structured_output import OBSERVATION_TOOL, OBSERVATION_TOOL_NAME, repair_json, tool_choice, tool_input, validate_observation
 
 load_dotenv()  # Load environment variables from .env file
 
 # Get API key from environment
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 
+# Stream each result card into place as it is written (set STREAM_OBSERVER=0 to wait for the full analysis)
+STREAM_OBSERVER = os.environ.get("STREAM_OBSERVER", "1") != "0"
+
 st.set_page_config(
     page_title="The Observer is the Observed",
     page_icon="👁",
@@ -17,225 +29,18 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Bright, vibrant CSS theme
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Playfair+Display:ital,wght@0,400;0,700;1,400&family=Inter:wght@300;400;500&display=swap');
-
-/* Main background */
-.stApp {
-    background: linear-gradient(#000, #000 0%, #000 50%, #000 100%);
-    min-height: 100vh;
-}
 
-/* Hide Streamlit default elements */
-#MainMenu, footer, header { visibility: hidden; }
-.block-container { padding-top: 2rem; padding-bottom: 3rem; max-width: 800px; }
-
-/* Typography */
-h1, h2, h3 { font-family: 'Playfair Display', serif !important; }
-
-/* Title styling */
-.main-title {
-    font-family: 'Playfair Display', serif;
-    font-size: 3rem;
-    font-weight: 700;
-    text-align: center;
-    background: linear-gradient(90deg, #ff6b6b, #feca57, #48dbfb, #ff9ff3);
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-    background-clip: text;
-    line-height: 1.2;
-    margin-bottom: 0.5rem;
-}
+@st.cache_resource(show_spinner=False)
+def warm_llm_connection(api_key):
+    """Open the pooled API connection once per process while the page renders."""
+    warm_connection(api_key)
 
-.subtitle {
-    font-family: 'Playfair Display', serif;
-    font-style: italic;
-    text-align: center;
-    color: #a29bfe;
-    font-size: 1.1rem;
-    margin-bottom: 0.3rem;
-}
 
-.tagline {
-    text-align: center;
-    color: #74b9ff;
-    font-size: 0.9rem;
-    margin-bottom: 2rem;
-    font-family: 'Inter', sans-serif;
-    font-weight: 300;
-}
+if ANTHROPIC_API_KEY:
+    warm_llm_connection(ANTHROPIC_API_KEY)
 
-/* Divider */
-.rainbow-divider {
-    height: 2px;
-    background: linear-gradient(90deg, #ff6b6b, #feca57, #48dbfb, #ff9ff3, #a29bfe);
-    border-radius: 2px;
-    margin: 1.5rem 0;
-}
-
-/* Card styles */
-.observer-card {
-    background: linear-gradient(135deg, rgba(255,107,107,0.15), rgba(254,202,87,0.1));
-    border: 1px solid rgba(255,107,107,0.4);
-    border-left: 4px solid #ff6b6b;
-    border-radius: 12px;
-    padding: 1.5rem;
-    margin: 1rem 0;
-}
-
-.observed-card {
-    background: linear-gradient(135deg, rgba(72,219,251,0.15), rgba(162,155,254,0.1));
-    border: 1px solid rgba(72,219,251,0.4);
-    border-left: 4px solid #48dbfb;
-    border-radius: 12px;
-    padding: 1.5rem;
-    margin: 1rem 0;
-}
-
-.unity-card {
-    background: linear-gradient(135deg, rgba(255,159,243,0.15), rgba(162,155,254,0.15));
-    border: 1px solid rgba(255,159,243,0.4);
-    border-radius: 12px;
-    padding: 1.5rem;
-    margin: 1rem 0;
-    text-align: center;
-}
-
-.reflection-card {
-    background: linear-gradient(135deg, rgba(254,202,87,0.12), rgba(255,107,107,0.08));
-    border: 1px solid rgba(254,202,87,0.3);
-    border-radius: 12px;
-    padding: 1.5rem;
-    margin: 1rem 0;
-}
-
-.mirror-card {
-    background: linear-gradient(135deg, rgba(162,155,254,0.2), rgba(72,219,251,0.1));
-    border: 2px solid rgba(162,155,254,0.5);
-    border-radius: 16px;
-    padding: 2rem;
-    margin: 1.5rem 0;
-    text-align: center;
-}
-
-.card-label {
-    font-family: 'Inter', sans-serif;
-    font-size: 0.7rem;
-    letter-spacing: 0.25em;
-    text-transform: uppercase;
-    font-weight: 500;
-    margin-bottom: 0.5rem;
-}
-
-.card-content {
-    font-family: 'Playfair Display', serif;
-    font-size: 1rem;
-    line-height: 1.7;
-    color: #dfe6e9;
-}
-
-.mirror-text {
-    font-family: 'Playfair Display', serif;
-    font-style: italic;
-    font-size: 1.3rem;
-    line-height: 1.6;
-    background: linear-gradient(90deg, #a29bfe, #74b9ff, #55efc4);
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-    background-clip: text;
-}
-
-.quote-box {
-    text-align: center;
-    padding: 1.5rem;
-    color: #fff;
-    font-family: 'Playfair Display', serif;
-    font-style: italic;
-    font-size: 0.85rem;
-    line-height: 1.8;
-    border-top: 1px solid rgba(255,255,255,0.05);
-    margin-top: 2rem;
-}
-
-.input-echo {
-    font-family: 'Playfair Display', serif;
-    font-style: italic;
-    color: #b2bec3;
-    font-size: 1rem;
-    padding: 1rem 1.5rem;
-    border-left: 3px solid rgba(162,155,254,0.5);
-    margin-bottom: 1.5rem;
-    background: rgba(255,255,255,0.03);
-    border-radius: 0 8px 8px 0;
-}
-
-/* Streamlit widget styling */
-.stTextArea textarea {
-    background: rgba(255,255,255,0.05) !important;
-    border: 1px solid rgba(162,155,254,0.3) !important;
-    border-radius: 12px !important;
-    color: #000 !important;
-    font-family: 'Playfair Display', serif !important;
-    font-style: italic !important;
-    font-size: 1rem !important;
-    padding: 1rem !important;
-}
-
-.stTextArea textarea:focus {
-    border-color: rgba(162,155,254,0.7) !important;
-    box-shadow: 0 0 0 2px rgba(162,155,254,0.1) !important;
-}
-
-.stButton button {
-    background: linear-gradient(135deg, #6c5ce7, #a29bfe) !important;
-    color: white !important;
-    border: none !important;
-    border-radius: 50px !important;
-    padding: 0.6rem 2.5rem !important;
-    font-family: 'Inter', sans-serif !important;
-    font-weight: 500 !important;
-    letter-spacing: 0.1em !important;
-    text-transform: uppercase !important;
-    font-size: 0.85rem !important;
-    transition: all 0.3s !important;
-    width: 100% !important;
-}
-
-.stButton button:hover {
-    background: linear-gradient(135deg, #a29bfe, #74b9ff) !important;
-    transform: translateY(-1px) !important;
-    box-shadow: 0 8px 20px rgba(108,92,231,0.4) !important;
-}
-
-/* Example pills */
-.example-pill {
-    display: inline-block;
-    background: rgba(255,255,255,0.05);
-    border: 1px solid rgba(255,255,255,0.1);
-    border-radius: 50px;
-    padding: 4px 14px;
-    font-size: 0.8rem;
-    color: #b2bec3;
-    margin: 3px;
-    cursor: pointer;
-    font-family: 'Inter', sans-serif;
-    font-style: italic;
-}
-
-/* Spinner color */
-.stSpinner > div { border-top-color: #FFFFFF; color: #FFFFFF !important; }
-
-/* Label colors */
-.observer-label { color: #ff6b6b; }
-.observed-label { color: #48dbfb; }
-.unity-label { color: #ff9ff3; }
-.reflection-label { color: #feca57; }
-.mirror-label { color: #a29bfe; }
-
-</style>
-""", unsafe_allow_html=True)
+# Bright, vibrant CSS theme
+st.markdown(inline_styles("observer.css"), unsafe_allow_html=True)
 
 SYSTEM_PROMPT = """You are a contemplative guide deeply versed in Jiddu Krishnamurti's teaching that "the observer is the observed."
 
@@ -259,7 +64,7 @@ Important guidelines:
 - The goal is not to help them feel better — it's to see clearly
 - Krishnamurti's key insight: thought creates the observer and the observed, then suffers from the division between them
 
-Respond ONLY with valid JSON in exactly this format:
+Record your response with the record_observation tool, filling in exactly these fields:
 {
   "observer": "brief description of the observer voice",
   "observed": "what is being observed",
@@ -268,17 +73,138 @@ Respond ONLY with valid JSON in exactly this format:
   "mirror": "one open question for direct seeing"
 }"""
 
-def analyze_with_claude(user_input):
-    client = anthropic.Anthropic()
-    response = client.messages.create(
-        model="claude-opus-4-5",
+# Calls are routed between tiers (see model_router); the cache namespace uses the primary model, so only its replies are kept
+OBSERVER_MODEL = primary_model("observer")
+
+# Canned inputs offered under "Try an example"; their analyses are pinned in the cache
+examples = [
+    "I keep procrastinating and I hate myself for it",
+    "I feel anxious about the future but I know I shouldn't",
+    "I'm angry at someone but trying not to be",
+    "I feel empty and I don't know why",
+    "I'm jealous and it feels shameful",
+    "I can't stop overthinking",
+]
+
+
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+
+def llm_session():
+    """Rate-limit calls made in the block against this session, showing its place in the queue if it has to wait."""
+    notice = st.empty()
+
+    def on_wait(position):
+        if position:
+            notice.caption(f"Many people are looking right now. You are #{position} in line...")
+        else:
+            notice.empty()
+
+    return session_scope(st.session_state.session_id, on_wait)
+
+
+@st.cache_resource(show_spinner=False)
+def get_observer_cache():
+    """Analysis cache shared by every session, scoped to the current model and prompt."""
+    namespace = hashlib.sha256(f"{OBSERVER_MODEL}\n{SYSTEM_PROMPT}".encode("utf-8")).hexdigest()[:16]
+    return ObserverCache(namespace, pinned=examples)
+
+
+def cacheable(model, stop_reason):
+    """Whether a reply may be cached under OBSERVER_MODEL's namespace: written by that model and not truncated."""
+    return is_model(model, OBSERVER_MODEL) and stop_reason != "max_tokens"
+
+
+def request_params(user_input):
+    """Messages API parameters for analysing an input."""
+    return dict(
+        model=OBSERVER_MODEL,
         max_tokens=1000,
+        # No cache_control: the prompt and tool (about 620 tokens) are far below the model's minimum cacheable prefix
         system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_input}]
+        tools=[OBSERVATION_TOOL],
+        tool_choice=tool_choice(OBSERVATION_TOOL_NAME),
+        messages=[{"role": "user", "content": user_input}],
     )
-    text = response.content[0].text
-    clean = text.replace("```json", "").replace("```", "").strip()
-    return json.loads(clean)
+
+
+def analyze_with_claude(user_input):
+    """The analysis of an input, and whether it may be cached, as (result, cacheable)."""
+    client = get_client(ANTHROPIC_API_KEY)
+    params = request_params(user_input)
+    # Identical analyses already in flight (or just asked for by this session) are shared
+    response = get_flights().do(request_key(params, ANTHROPIC_API_KEY), lambda: get_policy("observer").call(
+        lambda timeout: routed_create("observer", client, params, timeout),
+        tokens=estimate_tokens(params),
+    ))
+    return validate_observation(tool_input(response, OBSERVATION_TOOL_NAME)), cacheable(response.model, response.stop_reason)
+
+
+# Result cards in the order Claude writes them: field -> (card class, label HTML, content HTML)
+CARDS = {
+    "observer": ("observer-card", '<div class="card-label observer-label">👁 The Observer — the voice that separates</div>',
+                 '<div class="card-content">{}</div>'),
+    "observed": ("observed-card", '<div class="card-label observed-label">◉ The Observed — what is being watched</div>',
+                 '<div class="card-content">{}</div>'),
+    "unity": ("unity-card", '<div class="card-label unity-label">∞ They Are The Same Movement</div>',
+              '<div class="card-content" style="text-align:left;">{}</div>'),
+    "reflection": ("reflection-card", '<div class="card-label reflection-label">✦ Reflection</div>',
+                   '<div class="card-content">{}</div>'),
+    "mirror": ("mirror-card", '<div class="card-label mirror-label" style="margin-bottom:1rem;">◈ sit with this</div>',
+               '<div class="mirror-text">{}</div>'),
+}
+
+
+def render_card(field, text, container, writing=False):
+    """Draw one result card into its placeholder; a card still being written gets a cursor."""
+    card_class, label, content = CARDS[field]
+    container.markdown(f"""
+    <div class="{card_class}">
+        {label}
+        {content.format(text + ("▍" if writing else ""))}
+    </div>
+    """, unsafe_allow_html=True)
+
+
+def stream_analysis(user_input, placeholders):
+    """
+    Stream the analysis from Claude, filling each card as its field is written.
+    Returns (result, cacheable) like analyze_with_claude().
+    """
+    client = get_client(ANTHROPIC_API_KEY)
+    parser = ObjectStreamParser()
+    written = {}
+    chunks = []
+    params = request_params(user_input)
+    events = get_flights().stream(request_key(dict(params, stream=True), ANTHROPIC_API_KEY), lambda: get_policy("observer").stream(
+        lambda timeout: RoutedStream("observer", client, params, timeout),
+        tokens=estimate_tokens(params),
+    ))
+    model = stop_reason = None
+    for stream_event in events:
+        if stream_event.type == "message_start":
+            model = stream_event.message.model
+        elif stream_event.type == "message_delta":
+            stop_reason = stream_event.delta.stop_reason
+        if stream_event.type != "content_block_delta":
+            continue
+        # The tool input arrives as partial JSON; plain text only if the model ignored the tool
+        delta = stream_event.delta
+        chunk = delta.partial_json if delta.type == "input_json_delta" else getattr(delta, "text", "")
+        chunks.append(chunk)
+        for event, field, text in parser.feed(chunk):
+            if field not in placeholders:
+                continue
+            if event == "close":
+                render_card(field, text, placeholders[field])
+            else:
+                written[field] = written.get(field, "") + text
+                render_card(field, written[field], placeholders[field], writing=True)
+    result = parser.result()
+    if any(field not in result for field in CARDS):
+        result = repair_json("".join(chunks))
+    return validate_observation(result), model is not None and cacheable(model, stop_reason)
 
 
 # ─── UI ───────────────────────────────────────────────
@@ -289,15 +215,6 @@ st.markdown('<div class="tagline">Share a thought or emotion. See how the watche
 st.markdown('<div class="rainbow-divider"></div>', unsafe_allow_html=True)
 
 # Examples
-examples = [
-    "I keep procrastinating and I hate myself for it",
-    "I feel anxious about the future but I know I shouldn't",
-    "I'm angry at someone but trying not to be",
-    "I feel empty and I don't know why",
-    "I'm jealous and it feels shameful",
-    "I can't stop overthinking",
-]
-
 st.markdown(" <span style=\"color:#fff; font-weight:bold;\">Try an example:</span>", unsafe_allow_html=True)
 cols = st.columns(3)
 for i, ex in enumerate(examples):
@@ -325,55 +242,42 @@ with col2:
 if analyze_btn and user_input.strip():
     with st.spinner("Looking without the looker..."):
         try:
-            result = analyze_with_claude(user_input.strip())
-            
             st.markdown('<div class="rainbow-divider"></div>', unsafe_allow_html=True)
-            
+
             # Input echo
             st.markdown(f'<div class="input-echo">"{user_input.strip()}"</div>', unsafe_allow_html=True)
 
-            # Observer
-            st.markdown(f"""
-            <div class="observer-card">
-                <div class="card-label observer-label">👁 The Observer — the voice that separates</div>
-                <div class="card-content">{result['observer']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-            # Visual connector
-            st.markdown('<div style="text-align:center; font-size:1.5rem; color:#636e72; margin:0.2rem 0;">⟷</div>', unsafe_allow_html=True)
-
-            # Observed
-            st.markdown(f"""
-            <div class="observed-card">
-                <div class="card-label observed-label">◉ The Observed — what is being watched</div>
-                <div class="card-content">{result['observed']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-            # Unity
-            st.markdown(f"""
-            <div class="unity-card">
-                <div class="card-label unity-label">∞ They Are The Same Movement</div>
-                <div class="card-content" style="text-align:left;">{result['unity']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-            # Reflection
-            st.markdown(f"""
-            <div class="reflection-card">
-                <div class="card-label reflection-label">✦ Reflection</div>
-                <div class="card-content">{result['reflection']}</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-            # Mirror question
-            st.markdown(f"""
-            <div class="mirror-card">
-                <div class="card-label mirror-label" style="margin-bottom:1rem;">◈ sit with this</div>
-                <div class="mirror-text">{result['mirror']}</div>
-            </div>
-            """, unsafe_allow_html=True)
+            # One placeholder per card, so a streamed analysis can fill them in as it arrives
+            placeholders = {}
+            for field in CARDS:
+                placeholders[field] = st.empty()
+                if field == "observer":
+                    # Visual connector
+                    st.markdown('<div style="text-align:center; font-size:1.5rem; color:#636e72; margin:0.2rem 0;">⟷</div>', unsafe_allow_html=True)
+
+            cache = get_observer_cache()
+            result, _kind = cache.lookup(user_input.strip())
+            keep = False
+            if result is None:
+                try:
+                    with llm_session():
+                        if STREAM_OBSERVER:
+                            result, keep = stream_analysis(user_input.strip(), placeholders)
+                        else:
+                            result, keep = analyze_with_claude(user_input.strip())
+                except Exception as e:
+                    # While the API is degraded, fall back to the nearest analysis we already have
+                    result, _similarity = cache.closest(user_input.strip()) if is_unavailable(e) else (None, 0.0)
+                    if result is None:
+                        raise
+                    st.caption("The Observer is resting for a moment. Here is what it saw in a similar thought.")
+                else:
+                    # A fallback-tier or truncated analysis is shown but not kept under OBSERVER_MODEL's namespace
+                    if keep:
+                        cache.store(user_input.strip(), result)
+
+            for field, placeholder in placeholders.items():
+                render_card(field, result[field], placeholder)
 
             # K quote
             st.markdown("""
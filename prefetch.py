@@ -0,0 +1,151 @@
+"""
+Speculative contemplation prefetch for the Explore tab.
+
+While a teaching is on screen, the page pre-chooses the next random teaching
+and starts its contemplation here, on a small bounded thread pool. If the
+user moves on to it and asks to sit with it, the text is already cached (or
+nearly done). Prefetches the user never claims are cancelled if they have
+not started, and counted as waste if they have.
+
+Prefetches belong to the session that asked for them: only that session can
+claim or cancel them, and their calls are rate-limited against it. Finished
+prefetches nobody claims (the session went away) are forgotten after
+PREFETCH_KEEP_SECONDS, and at most PREFETCH_MAX_FINISHED are kept at once.
+
+prefetch_stats() reports the counters used to tune how aggressive this is.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from contemplation import cache_key, get_contemplation, get_store
+from rate_limit import session_scope
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_WORKERS = int(os.environ.get("CONTEMPLATION_PREFETCH_WORKERS", 2))
+# Prefetches allowed to wait for a worker before new ones are skipped
+PREFETCH_MAX_PENDING = int(os.environ.get("CONTEMPLATION_PREFETCH_MAX_PENDING", 8))
+# How long a finished, unclaimed prefetch is kept for its session, and how many are kept at most
+PREFETCH_KEEP_SECONDS = int(os.environ.get("CONTEMPLATION_PREFETCH_KEEP", 600))
+PREFETCH_MAX_FINISHED = 64
+
+
+class ContemplationPrefetcher:
+    """Bounded background generation of contemplations the user will probably ask for."""
+
+    def __init__(self, workers=PREFETCH_WORKERS, max_pending=PREFETCH_MAX_PENDING,
+                 keep_seconds=PREFETCH_KEEP_SECONDS, max_finished=PREFETCH_MAX_FINISHED):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="contemplation-prefetch")
+        self._max_pending = max_pending
+        self._keep_seconds = keep_seconds
+        self._max_finished = max_finished
+        self._futures = {}  # (session, cache key) -> (Future, submitted at)
+        self._lock = threading.Lock()
+        self._stats = {"issued": 0, "hits": 0, "wasted": 0, "cancelled": 0, "skipped": 0}
+
+    def _evict(self, now):
+        """Forget finished prefetches past keep_seconds, and the oldest beyond max_finished. Caller holds the lock."""
+        finished = sorted((submitted, key) for key, (future, submitted) in self._futures.items() if future.done())
+        excess = len(finished) - self._max_finished
+        for i, (submitted, key) in enumerate(finished):
+            if i < excess or now - submitted > self._keep_seconds:
+                del self._futures[key]
+                self._stats["wasted"] += 1
+
+    def prefetch(self, teaching, api_key, session=None):
+        """Start generating a teaching's contemplation for a session unless it is cached, running or over budget."""
+        key = (session, cache_key(teaching))
+        if key[1] in get_store():
+            return
+        with self._lock:
+            self._evict(time.monotonic())
+            if key in self._futures:
+                return
+            pending = sum(1 for f, _ in self._futures.values() if not f.done())
+            if pending >= self._max_pending:
+                self._stats["skipped"] += 1
+                return
+            future = self._executor.submit(self._generate, teaching, api_key, session)
+            self._futures[key] = (future, time.monotonic())
+            self._stats["issued"] += 1
+
+    def _generate(self, teaching, api_key, session):
+        try:
+            with session_scope(session):
+                return get_contemplation(teaching, api_key, fallback=False)
+        except Exception:
+            logger.exception("Prefetch failed for %s", teaching["philosopher"])
+            return None
+
+    def _pop(self, teaching, session):
+        future, _submitted = self._futures.pop((session, cache_key(teaching)), (None, None))
+        return future
+
+    def claim(self, teaching, session=None):
+        """
+        The prefetched contemplation for a teaching, waiting for it if still running.
+
+        Returns None when nothing was prefetched for this session (or the
+        prefetch failed), in which case the caller generates it as usual.
+        """
+        with self._lock:
+            future = self._pop(teaching, session)
+            if future is None:
+                return None
+            if future.cancel():
+                # Never started: cheaper to let the caller stream it
+                self._stats["cancelled"] += 1
+                return None
+            self._stats["hits"] += 1
+        return future.result()
+
+    def cancel(self, teaching, session=None):
+        """Abandon a session's prefetch of a teaching: cancel it if queued, count it as waste otherwise."""
+        with self._lock:
+            future = self._pop(teaching, session)
+            if future is None:
+                return
+            if future.cancel():
+                self._stats["cancelled"] += 1
+            else:
+                self._stats["wasted"] += 1
+
+    def stats(self):
+        """Counters: issued, hits, wasted, cancelled, skipped, plus in_flight."""
+        with self._lock:
+            in_flight = sum(1 for f, _ in self._futures.values() if not f.done())
+            return dict(self._stats, in_flight=in_flight)
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """Return the process-wide prefetcher."""
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = ContemplationPrefetcher()
+    return _prefetcher
+
+
+def prefetch_contemplation(teaching, api_key, session=None):
+    get_prefetcher().prefetch(teaching, api_key, session)
+
+
+def claim_prefetched_contemplation(teaching, session=None):
+    return get_prefetcher().claim(teaching, session)
+
+
+def cancel_prefetch(teaching, session=None):
+    get_prefetcher().cancel(teaching, session)
+
+
+def prefetch_stats():
+    return get_prefetcher().stats()
@@ -0,0 +1,162 @@
+"""
+Pre-generate contemplations for the whole curated corpus, without Streamlit.
+
+Walks every teaching in teachings.TEACHINGS and writes its contemplation into
+the contemplation cache. Teachings that are already cached are skipped, so an
+interrupted run picks up where it left off.
+
+Usage:
+    python pregenerate.py                    # concurrent requests (default 8 at a time)
+    python pregenerate.py --concurrency 16
+    python pregenerate.py --batch            # submit one Message Batch instead
+    python pregenerate.py --base-url http://127.0.0.1:8765   # e.g. against fake_anthropic.py
+
+Set CONTEMPLATION_CACHE_DIR to write somewhere other than the app's cache.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from contemplation import CACHE_DIR, cache_key, cacheable, get_store, request_params
+from llm_client import get_client, make_async_client
+from teachings import TEACHINGS
+
+load_dotenv()
+
+
+def pending_teachings(teachings):
+    """Teachings with no cached contemplation yet, keyed by cache key."""
+    store = get_store()
+    pending = {}
+    for teaching in teachings:
+        key = cache_key(teaching)
+        if key not in store:
+            pending.setdefault(key, teaching)
+    return pending
+
+
+async def generate_concurrently(pending, api_key, concurrency):
+    """Generate contemplations with at most `concurrency` requests in flight."""
+    store = get_store()
+    semaphore = asyncio.Semaphore(concurrency)
+    client = make_async_client(api_key)
+    done = failed = 0
+
+    async def one(key, teaching):
+        nonlocal done, failed
+        async with semaphore:
+            try:
+                message = await client.messages.create(**request_params(teaching))
+            except Exception as e:
+                failed += 1
+                print(f"  ✗ {teaching['philosopher']}: {e}", file=sys.stderr)
+                return
+        if not cacheable(message.model, message.stop_reason):
+            failed += 1
+            print(f"  ✗ {teaching['philosopher']}: not cacheable ({message.model}, {message.stop_reason})",
+                  file=sys.stderr)
+            return
+        # Written as each one finishes, so an interrupted run loses nothing
+        store.set(key, message.content[0].text)
+        done += 1
+        print(f"  ✓ [{done}/{len(pending)}] {teaching['philosopher']}")
+
+    try:
+        await asyncio.gather(*(one(key, teaching) for key, teaching in pending.items()))
+    finally:
+        await client.close()
+    return done, failed
+
+
+def generate_with_batch(pending, api_key, state_path, poll_seconds=30):
+    """
+    Submit every pending teaching as one Message Batch and store the results.
+
+    The batch id is saved to state_path so that re-running after an
+    interruption resumes polling the same batch instead of submitting again.
+    """
+    client = get_client(api_key)
+    store = get_store()
+
+    batch_id = None
+    if os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as f:
+            batch_id = json.load(f).get("batch_id")
+        print(f"Resuming batch {batch_id}")
+
+    if batch_id is None:
+        batch = client.messages.batches.create(
+            requests=[{"custom_id": key, "params": request_params(t)} for key, t in pending.items()]
+        )
+        batch_id = batch.id
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump({"batch_id": batch_id}, f)
+        print(f"Submitted batch {batch_id} with {len(pending)} requests")
+
+    batch = client.messages.batches.retrieve(batch_id)
+    while batch.processing_status != "ended":
+        print(f"  … {batch.request_counts.processing} still processing")
+        time.sleep(poll_seconds)
+        batch = client.messages.batches.retrieve(batch_id)
+
+    done = failed = 0
+    for entry in client.messages.batches.results(batch_id):
+        if entry.result.type != "succeeded":
+            failed += 1
+            print(f"  ✗ {entry.custom_id}: {entry.result.type}", file=sys.stderr)
+        elif not cacheable(entry.result.message.model, entry.result.message.stop_reason):
+            failed += 1
+            print(f"  ✗ {entry.custom_id}: not cacheable ({entry.result.message.model}, "
+                  f"{entry.result.message.stop_reason})", file=sys.stderr)
+        else:
+            store.set(entry.custom_id, entry.result.message.content[0].text)
+            done += 1
+
+    os.remove(state_path)
+    return done, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate contemplations for every curated teaching.")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once (default 8)")
+    parser.add_argument("--batch", action="store_true", help="submit everything through the Message Batches API")
+    parser.add_argument("--base-url", help="API base URL, e.g. a local fake_anthropic.py server")
+    parser.add_argument("--limit", type=int, help="only generate this many (useful for trial runs)")
+    args = parser.parse_args(argv)
+
+    if args.base_url:
+        os.environ["ANTHROPIC_BASE_URL"] = args.base_url
+
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        if not args.base_url:
+            parser.error("ANTHROPIC_API_KEY is not set")
+        api_key = "fake-key"
+
+    pending = pending_teachings(TEACHINGS)
+    if args.limit is not None:
+        pending = dict(list(pending.items())[:args.limit])
+    print(f"{len(TEACHINGS)} teachings, {len(pending)} without a cached contemplation")
+    if not pending:
+        return 0
+
+    start = time.perf_counter()
+    if args.batch:
+        # Kept beside (not inside) the cache directory so the cache never indexes it
+        state_path = os.path.join(os.path.dirname(CACHE_DIR), "pregenerate_batch.json")
+        done, failed = generate_with_batch(pending, api_key, state_path)
+    else:
+        done, failed = asyncio.run(generate_concurrently(pending, api_key, args.concurrency))
+    print(f"Generated {done}, failed {failed} in {time.perf_counter() - start:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Pre-warm the contemplation cache with tomorrow's daily teachings.
+
+teachings.daily_teaching() is a pure function of the date, so the seven daily picks
+(one per theme) are known a day ahead. A background thread wakes shortly
+before local midnight and generates their contemplations, so the morning rush
+on the Today's Teaching tab is served from cache.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from contemplation import cache_key, get_contemplation, get_store
+from teachings import THEMES, daily_teaching
+
+logger = logging.getLogger(__name__)
+
+# How long before local midnight the pre-warm run starts
+PREWARM_LEAD_SECONDS = int(os.environ.get("CONTEMPLATION_PREWARM_LEAD", 30 * 60))
+
+_started = False
+_lock = threading.Lock()
+
+
+def daily_picks(day):
+    """Return the unique daily teachings across all themes for a given date."""
+    picks = {}
+    for theme in THEMES:
+        teaching = daily_teaching(theme, day)
+        if teaching is not None:
+            picks.setdefault(cache_key(teaching), teaching)
+    return list(picks.values())
+
+
+def prewarm(day, api_key):
+    """Generate and cache contemplations for a day's picks. Returns how many were generated."""
+    store = get_store()
+    generated = 0
+    for teaching in daily_picks(day):
+        if cache_key(teaching) in store:
+            continue
+        try:
+            get_contemplation(teaching, api_key, fallback=False)
+            generated += 1
+        except Exception:
+            logger.exception("Pre-warm failed for %s", teaching["philosopher"])
+    return generated
+
+
+def seconds_until_next_run(now=None):
+    """Seconds from now until PREWARM_LEAD_SECONDS before the next local midnight."""
+    now = now or datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    run_at = midnight - timedelta(seconds=PREWARM_LEAD_SECONDS)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return (run_at - now).total_seconds()
+
+
+def _run(api_key):
+    # Cover today too in case the server started after last night's run
+    prewarm(date.today(), api_key)
+    while True:
+        time.sleep(seconds_until_next_run())
+        tomorrow = date.today() + timedelta(days=1)
+        count = prewarm(tomorrow, api_key)
+        logger.info("Pre-warmed %d contemplations for %s", count, tomorrow)
+
+
+def start_prewarm_scheduler(api_key):
+    """Start the pre-warm thread; later calls in the same process do nothing."""
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_run, args=(api_key,), name="contemplation-prewarm", daemon=True).start()
@@ -0,0 +1,251 @@
+"""
+Process-wide token-bucket rate limiting for Anthropic calls.
+
+One RateLimiter covers requests per minute and tokens per minute for the
+whole server. Each browser session also gets a smaller sub-quota of both, so
+one busy tab cannot starve the rest. A call that finds no capacity waits in a
+FIFO queue instead of failing. Queued calls are admitted in arrival order,
+skipping over any whose own session quota is spent. While a call waits, the
+session's on_wait callback is told its place in line, so the page can show
+it.
+
+Calls reserve an estimate (prompt size plus max_tokens) up front and settle
+the difference once the response reports its actual usage.
+
+The session is carried in a context variable:
+
+    with session_scope(session_id, on_wait=show_position):
+        ...  # any policy-wrapped call made here is limited per session
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+REQUESTS_PER_MINUTE = int(os.environ.get("LLM_REQUESTS_PER_MINUTE", 50))
+TOKENS_PER_MINUTE = int(os.environ.get("LLM_TOKENS_PER_MINUTE", 80_000))
+SESSION_REQUESTS_PER_MINUTE = int(os.environ.get("LLM_SESSION_REQUESTS_PER_MINUTE", 10))
+SESSION_TOKENS_PER_MINUTE = int(os.environ.get("LLM_SESSION_TOKENS_PER_MINUTE", 20_000))
+SESSION_IDLE_SECONDS = 600
+
+_session = contextvars.ContextVar("llm_session", default=(None, None))
+
+
+class QueueTimeout(RuntimeError):
+    """Raised when a call could not be admitted before its deadline."""
+
+
+@contextmanager
+def session_scope(session_id, on_wait=None):
+    """Attribute calls made inside the block to a session; on_wait(position) hears about queueing."""
+    token = _session.set((session_id, on_wait))
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def current_session():
+    """The session id set by the enclosing session_scope, or None."""
+    return _session.get()[0]
+
+
+def estimate_tokens(params):
+    """Rough token cost of a Messages API request: about four characters per token, plus max_tokens."""
+    prompt = json.dumps([params.get("system", ""), params.get("messages", []), params.get("tools", [])], ensure_ascii=False)
+    return len(prompt) // 4 + params.get("max_tokens", 0)
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 per second up to capacity; may go into debt."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount (capped at capacity) is available; 0 if it is now."""
+        self._refill(now)
+        deficit = min(amount, self.capacity) - self.level
+        return max(deficit, 0.0) / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount):
+        """Take (or with a negative amount, return) tokens after the fact."""
+        self.level = min(self.capacity, self.level - amount)
+
+
+class Grant:
+    """An admitted call's reservation, settled against actual usage afterwards."""
+
+    __slots__ = ("session", "tokens")
+
+    def __init__(self, session, tokens):
+        self.session = session
+        self.tokens = tokens
+
+
+class _Ticket:
+    """One call's place in the queue. Tickets compare by identity, so equal requests stay distinct."""
+
+    __slots__ = ("session", "tokens")
+
+    def __init__(self, session, tokens):
+        self.session = session
+        self.tokens = tokens
+
+
+class RateLimiter:
+    """Global requests/min and tokens/min buckets, with per-session sub-quotas and a fair queue."""
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 session_requests_per_minute=SESSION_REQUESTS_PER_MINUTE,
+                 session_tokens_per_minute=SESSION_TOKENS_PER_MINUTE):
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._session_limits = (session_requests_per_minute, session_tokens_per_minute)
+        self._sessions = {}  # session id -> [requests bucket, tokens bucket, last used]
+        self._waiting = []   # queued _Tickets in arrival order
+        self._cond = threading.Condition()
+        self._stats = {"admitted": 0, "queued": 0, "timeouts": 0, "max_queue": 0}
+
+    def _session_buckets(self, session, now):
+        if session is None:
+            return None
+        buckets = self._sessions.get(session)
+        if buckets is None:
+            for sid, (_r, _t, last_used) in list(self._sessions.items()):
+                if now - last_used > SESSION_IDLE_SECONDS:
+                    del self._sessions[sid]
+            buckets = self._sessions[session] = [TokenBucket(self._session_limits[0]),
+                                                 TokenBucket(self._session_limits[1]), now]
+        buckets[2] = now
+        return buckets
+
+    def _session_wait(self, ticket, now):
+        buckets = self._session_buckets(ticket.session, now)
+        if buckets is None:
+            return 0.0
+        return max(buckets[0].wait_time(1, now), buckets[1].wait_time(ticket.tokens, now))
+
+    def _global_wait(self, tokens, now):
+        return max(self._requests.wait_time(1, now), self._tokens.wait_time(tokens, now))
+
+    def _take(self, ticket, now):
+        self._requests.take(1, now)
+        self._tokens.take(ticket.tokens, now)
+        buckets = self._session_buckets(ticket.session, now)
+        if buckets is not None:
+            buckets[0].take(1, now)
+            buckets[1].take(ticket.tokens, now)
+        self._stats["admitted"] += 1
+
+    def try_acquire(self, tokens):
+        """Admit a call only if nobody is queued and there is capacity now; else None. Never waits."""
+        session, _on_wait = _session.get()
+        ticket = _Ticket(session, tokens)
+        with self._cond:
+            now = time.monotonic()
+            if self._waiting or self._global_wait(tokens, now) or self._session_wait(ticket, now):
+                return None
+            self._take(ticket, now)
+            return Grant(session, tokens)
+
+    def acquire(self, tokens, timeout=None):
+        """
+        Wait for capacity for one request of about `tokens` tokens and return its Grant.
+
+        Raises QueueTimeout if the call is not admitted within timeout seconds.
+        on_wait (a UI callback) is only ever called with the lock released.
+        """
+        session, on_wait = _session.get()
+        ticket = _Ticket(session, tokens)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        shown = None
+        queued = False
+        with self._cond:
+            self._waiting.append(ticket)
+        try:
+            while True:
+                admitted = False
+                with self._cond:
+                    while True:
+                        now = time.monotonic()
+                        # First in line among the calls their own session quota allows
+                        head = next((t for t in self._waiting if not self._session_wait(t, now)), None)
+                        global_wait = self._global_wait(tokens, now)
+                        if head is ticket and not global_wait:
+                            self._take(ticket, now)
+                            self._waiting.remove(ticket)
+                            admitted = True
+                            break
+
+                        if not queued:
+                            queued = True
+                            self._stats["queued"] += 1
+                            self._stats["max_queue"] = max(self._stats["max_queue"], len(self._waiting))
+                        position = self._waiting.index(ticket) + 1
+                        if on_wait and position != shown:
+                            break  # Report the new position outside the lock, then look again
+
+                        wait = max(global_wait, self._session_wait(ticket, now), 0.05)
+                        if deadline is not None:
+                            if now >= deadline:
+                                self._stats["timeouts"] += 1
+                                raise QueueTimeout("Too many people are contemplating right now; please try again shortly")
+                            wait = min(wait, deadline - now)
+                        self._cond.wait(min(wait, 1.0))
+                if admitted:
+                    if shown and on_wait:
+                        on_wait(0)
+                    return Grant(session, tokens)
+                on_wait(position)
+                shown = position
+        finally:
+            with self._cond:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+    def settle(self, grant, actual_tokens):
+        """Charge (or refund) the difference between a grant's estimate and the tokens actually used."""
+        if grant is None or actual_tokens is None:
+            return
+        with self._cond:
+            difference = actual_tokens - grant.tokens
+            self._tokens.adjust(difference)
+            buckets = self._sessions.get(grant.session)
+            if buckets is not None:
+                buckets[1].adjust(difference)
+            self._cond.notify_all()
+
+    def stats(self):
+        """Admission counters plus the current queue length."""
+        with self._cond:
+            return dict(self._stats, waiting=len(self._waiting))
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Return the process-wide rate limiter."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
@@ -0,0 +1,161 @@
+"""
+Wall-clock timing of Streamlit script runs and fragment runs.
+
+A page records how long each full script run takes, and wraps each fragment
+body in timed(scope). timing_report() summarises the recent durations per
+scope, so the cost of a click can be compared between a full rerun and a
+fragment rerun (Sit With This can switch fragments off with
+SIT_FRAGMENTS=0 for exactly this comparison).
+
+Runs interrupted by a newer rerun are not recorded. Timings are shared by
+every session in the process.
+
+Run `python rerun_timing.py [clicks]` to measure a click as the browser sees
+it. It starts Sit With This under `streamlit run` with SIT_FRAGMENTS=0 and
+then =1, connects to each over the websocket the way the browser does, and
+clicks through the Today tab's theme pills. For each setting it reports the
+time from sending a click to the end of the run, and the bytes and deltas
+sent back.
+
+This module must stay importable without Streamlit.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+SAMPLES_PER_SCOPE = 200
+
+_samples = {}  # scope -> recent durations in seconds
+_lock = threading.Lock()
+
+
+def record(scope, seconds):
+    """Record one run of a scope."""
+    with _lock:
+        _samples.setdefault(scope, deque(maxlen=SAMPLES_PER_SCOPE)).append(seconds)
+
+
+@contextmanager
+def timed(scope):
+    """Time the block as one run of scope; a block left by an exception is not recorded."""
+    start = time.perf_counter()
+    yield
+    record(scope, time.perf_counter() - start)
+
+
+def timing_report():
+    """{scope: {"runs", "p50_ms", "p95_ms", "last_ms"}} over the recent runs of each scope."""
+    report = {}
+    with _lock:
+        for scope, samples in _samples.items():
+            ordered = sorted(samples)
+            report[scope] = {
+                "runs": len(samples),
+                "p50_ms": ordered[len(ordered) // 2] * 1000,
+                "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+                "last_ms": samples[-1] * 1000,
+            }
+    return report
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def _serve(script, port, env):
+    """Start `streamlit run script` on port and wait until it answers its health check."""
+    import subprocess
+    import urllib.request
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", script, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"streamlit run {script} did not come up on port {port}")
+
+
+async def _run(ws, client_state):
+    """Send one rerun and read until it finishes: (seconds, bytes, deltas, {button id: fragment id})."""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    message = BackMsg()
+    message.rerun_script.CopyFrom(client_state)
+    start = time.perf_counter()
+    received = deltas = 0
+    buttons = {}
+    await ws.write_message(message.SerializeToString(), binary=True)
+    while True:
+        raw = await ws.read_message()
+        if raw is None:
+            raise RuntimeError("the server closed the websocket")
+        received += len(raw)
+        forward = ForwardMsg()
+        forward.ParseFromString(raw)
+        kind = forward.WhichOneof("type")
+        if kind == "delta":
+            deltas += 1
+            delta = forward.delta
+            if delta.WhichOneof("type") == "new_element" and delta.new_element.WhichOneof("type") == "button":
+                buttons[delta.new_element.button.id] = delta.fragment_id
+        elif kind == "script_finished":
+            return time.perf_counter() - start, received, deltas, buttons
+
+
+async def _click_through(port, clicks, warmup):
+    """Click the Today tab's theme pills in turn; (seconds, bytes, deltas) per measured click."""
+    from streamlit.proto.ClientState_pb2 import ClientState
+    from tornado.websocket import websocket_connect
+
+    ws = await websocket_connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"])
+    try:
+        *_, buttons = await _run(ws, ClientState())
+        pills = sorted(button for button in buttons if "theme_btn_" in button and button.endswith("_daily"))
+        results = []
+        for i in range(warmup + clicks):
+            pill = pills[i % len(pills)]
+            state = ClientState(fragment_id=buttons[pill])
+            state.widget_states.widgets.add(id=pill, trigger_value=True)
+            seconds, received, deltas, _ = await _run(ws, state)
+            if i >= warmup:
+                results.append((seconds, received, deltas))
+        return results
+    finally:
+        ws.close()
+
+
+def benchmark(clicks=100, warmup=10, script="SitwithIt.py", port=8599):
+    """Time theme-pill clicks on Sit With This with fragments off and on."""
+    import asyncio
+
+    print(f"{clicks} theme-pill clicks on {script} (after {warmup} warm-up clicks), no API key")
+    print(f"{'SIT_FRAGMENTS':<15}{'p50 ms':>9}{'p95 ms':>9}{'KB/click':>10}{'deltas/click':>14}")
+    for fragments in ("0", "1"):
+        server = _serve(script, port, {"SIT_FRAGMENTS": fragments, "ANTHROPIC_API_KEY": ""})
+        try:
+            results = asyncio.run(_click_through(port, clicks, warmup))
+        finally:
+            server.terminate()
+            server.wait()
+        seconds = [r[0] for r in results]
+        print(f"{fragments:<15}{_percentile(seconds, 0.5) * 1000:>9.1f}{_percentile(seconds, 0.95) * 1000:>9.1f}"
+              f"{sum(r[1] for r in results) / len(results) / 1024:>10.1f}"
+              f"{sum(r[2] for r in results) / len(results):>14.1f}")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
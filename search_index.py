@@ -0,0 +1,276 @@
+"""
+In-memory BM25 full-text search over teachings.
+
+The index covers the teaching text and the philosopher's name. It is built
+once per process into NumPy arrays in compressed-column form: for each term,
+the teachings that use it and their precomputed BM25 weights, grouped by
+theme so a theme-filtered query reads only that theme's postings. A query is
+a vectorised add over the postings of each of its terms, and only the top (page + 1) *
+per_page scores are selected (argpartition) and sorted, so common terms cost
+about as little as rare ones.
+
+The last query word (or any word ending in "*") may still be being typed,
+so it also matches the words it is a prefix of ("riv" finds "river"). It is
+compared with the words as written in the teachings, and each match counts
+as that word's stem, so "quietl" finds what "quietly" does. A word cut off
+inside a suffix is also stemmed as the whole word would be ("lovi" as
+"loving"). Prefixes shorter than MIN_PREFIX_LENGTH only match whole words,
+and a prefix expands to at most MAX_PREFIX_EXPANSIONS stems, the most
+widely used ones.
+
+Run `python search_index.py [N]` to check search-as-you-type on a few
+teachings, then time queries over N synthetic teachings.
+"""
+
+import bisect
+import re
+from collections import Counter, namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+K1 = 1.2
+B = 0.75
+PHILOSOPHER_BOOST = 2.0
+MIN_PREFIX_LENGTH = 3
+MAX_PREFIX_EXPANSIONS = 8
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i if in into is it its not of on or so "
+    "that the their there they this to was we what when where which who will with you your".split()
+)
+
+_WORD = re.compile(r"\w+")
+
+SearchResults = namedtuple("SearchResults", "total page per_page hits")
+
+
+SUFFIXES = (("sses", "ss"), ("ies", "y"), ("ness", ""), ("ment", ""),
+            ("ing", ""), ("edly", ""), ("ed", ""), ("ly", ""), ("s", ""))
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    """A light suffix-stripping stemmer: enough to match river/rivers, love/loving, quietly/quiet, stillness/still."""
+    for suffix, replacement in SUFFIXES:
+        # "ss" is not a plural: stillness, not stillnes
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not (suffix == "s" and word.endswith("ss")):
+            word = word[: len(word) - len(suffix)] + replacement
+            break
+    # love, loved and loving all stem to "lov"
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+def words(text):
+    """Lowercase words of text, stopwords dropped."""
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+def tokenize(text):
+    """Lowercase, split into words, drop stopwords and stem."""
+    return [stem(w) for w in words(text)]
+
+
+class SearchIndex:
+    """
+    BM25 inverted index over a sequence of teachings (a list or a teaching
+    store). The index is built in one pass over it and keeps only a reference,
+    fetching records by position for the hits it returns.
+    """
+
+    def __init__(self, teachings):
+        self._teachings = teachings
+
+        term_freqs = []
+        lengths = []
+        surfaces = set()
+        doc_themes = []
+        self._theme_codes = {}
+        for teaching in teachings:
+            doc_themes.append(self._theme_codes.setdefault(teaching["theme"], len(self._theme_codes)))
+            text_words = words(teaching["teaching"])
+            philosopher_words = words(teaching["philosopher"])
+            surfaces.update(text_words, philosopher_words)
+            counts = Counter(stem(w) for w in text_words)
+            for w in philosopher_words:
+                counts[stem(w)] += PHILOSOPHER_BOOST
+            term_freqs.append(counts)
+            lengths.append(sum(counts.values()))
+
+        self._vocabulary = sorted({term for counts in term_freqs for term in counts})
+        term_ids = {term: i for i, term in enumerate(self._vocabulary)}
+        # Words as written, sorted so the words sharing a prefix are one contiguous range, and their stems' ids
+        self._surfaces = sorted(surfaces)
+        self._surface_terms = np.fromiter((term_ids[stem(w)] for w in self._surfaces), dtype=np.int64,
+                                          count=len(self._surfaces))
+        rows, cols, tfs = [], [], []
+        for doc_id, counts in enumerate(term_freqs):
+            rows.extend([doc_id] * len(counts))
+            cols.extend(term_ids[term] for term in counts)
+            tfs.extend(counts.values())
+
+        self._n = n = len(term_freqs)
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float64)
+        lengths = np.asarray(lengths, dtype=np.float64)
+        self._doc_freq = np.bincount(cols, minlength=len(self._vocabulary))
+        idf = np.log(1 + (n - self._doc_freq + 0.5) / (self._doc_freq + 0.5))
+        avg_length = lengths.mean() if n else 0.0
+        norms = K1 * (1 - B + B * lengths / avg_length) if avg_length else np.full(n, K1)
+        weights = idf[cols] * tfs * (K1 + 1) / (tfs + norms[rows])
+
+        doc_themes = np.asarray(doc_themes, dtype=np.int64)
+        # Compressed-column layout, by term then theme: the postings of term t in theme c live in
+        # [ptr[t * T + c], ptr[t * T + c + 1]), and all of term t's in [ptr[t * T], ptr[(t + 1) * T])
+        themes = max(len(self._theme_codes), 1)
+        slots = cols * themes + doc_themes[rows]
+        order = np.argsort(slots, kind="stable")
+        self._doc_ids = rows[order]
+        self._weights = weights[order].astype(np.float32)
+        self._ptr = np.concatenate(([0], np.cumsum(np.bincount(slots, minlength=len(self._vocabulary) * themes))))
+        self._expand = lru_cache(maxsize=4096)(self._expand_uncached)
+
+    def __len__(self):
+        return self._n
+
+    def _term_id(self, term):
+        i = bisect.bisect_left(self._vocabulary, term)
+        return i if i < len(self._vocabulary) and self._vocabulary[i] == term else None
+
+    def _expand_uncached(self, word, prefix):
+        """
+        Term ids a query word matches: its stem and, for a word that may be
+        unfinished, the stems of the most used words it could become.
+        """
+        terms = {self._term_id(stem(word))}
+        if prefix and len(word) >= MIN_PREFIX_LENGTH:
+            # Cut off inside a suffix: "lovi" stems as "loving", "quietl" as "quietly"
+            for suffix, _ in SUFFIXES:
+                for cut in range(1, len(suffix)):
+                    if word.endswith(suffix[:cut]):
+                        terms.add(self._term_id(stem(word + suffix[cut:])))
+            start = bisect.bisect_left(self._surfaces, word)
+            end = bisect.bisect_left(self._surfaces, word + "\U0010ffff", start)
+            completions = np.unique(self._surface_terms[start:end])
+            if len(completions) > MAX_PREFIX_EXPANSIONS:
+                most_used = np.argpartition(-self._doc_freq[completions], MAX_PREFIX_EXPANSIONS - 1)
+                completions = completions[most_used[:MAX_PREFIX_EXPANSIONS]]
+            terms.update(completions.tolist())
+        terms.discard(None)
+        return frozenset(terms)
+
+    def _query_terms(self, query):
+        words = _WORD.findall(query.lower())
+        trailing_prefix = not query.endswith(" ")
+        terms = set()
+        for i, word in enumerate(words):
+            prefix = word.endswith("*") or (trailing_prefix and i == len(words) - 1)
+            word = word.rstrip("*")
+            if word and (prefix or word not in STOPWORDS):
+                terms.update(self._expand(word, prefix))
+        return np.fromiter(terms, dtype=np.int64, count=len(terms))
+
+    def scores(self, query, theme=None):
+        """BM25 score of query against every teaching (0 outside the theme), as a float array."""
+        n = self._n
+        themes = max(len(self._theme_codes), 1)
+        slots = self._query_terms(query) * themes
+        if theme is None:
+            starts, ends = self._ptr[slots], self._ptr[slots + themes]
+        elif theme in self._theme_codes:
+            code = self._theme_codes[theme]
+            starts, ends = self._ptr[slots + code], self._ptr[slots + code + 1]
+        else:
+            return np.zeros(n, dtype=np.float32)
+        scores = np.zeros(n, dtype=np.float32)
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            # A term has at most one posting per teaching, so the fancy-indexed add is exact
+            scores[self._doc_ids[start:end]] += self._weights[start:end]
+        return scores
+
+    def search(self, query, theme=None, page=0, per_page=10):
+        """Ranked, paginated matches for query, optionally within one theme."""
+        if theme == "all":
+            theme = None
+        scores = self.scores(query, theme)
+        total = int(np.count_nonzero(scores))
+        limit = min((page + 1) * per_page, total)
+        if limit <= page * per_page:
+            return SearchResults(total=total, page=page, per_page=per_page, hits=())
+
+        # Select the top `limit` without sorting the rest, then order just those
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.lexsort((top, -scores[top]))][page * per_page:]
+        hits = tuple(self._teachings[i] for i in top)
+        return SearchResults(total=total, page=page, per_page=per_page, hits=hits)
+
+
+RARE_QUERIES = ("river", "silence of the mind", "riv", "love without fear", "breath")
+# word0, word1, ... are the most frequent words of the synthetic corpus; "w" and "wo" are below MIN_PREFIX_LENGTH
+COMMON_QUERIES = ("word0", "word1 word2 word3", "word0 word1 word2 word3 word4 word5", "w", "wo", "wor", "word1*")
+
+
+def benchmark(n=100_000, queries=RARE_QUERIES + COMMON_QUERIES, repeat=20):
+    """Print build time and mean per-query latency over n synthetic teachings."""
+    import itertools
+    import random
+    import time
+
+    # Zipf-distributed vocabulary, so term frequencies look like real prose
+    rng = random.Random(0)
+    vocabulary = [f"word{i}" for i in range(8000)]
+    for i, word in enumerate("river silence mind love fear breath ocean".split()):
+        vocabulary[50 + 40 * i] = word
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    themes = ["mind", "love", "body", "ego", "freedom", "stillness"]
+    teachings = [
+        {"philosopher": f"Philosopher {rng.randrange(400)}", "theme": rng.choice(themes), "tradition": "Western",
+         "teaching": " ".join(rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(15, 40)))}
+        for _ in range(n)
+    ]
+    start = time.perf_counter()
+    index = SearchIndex(teachings)
+    print(f"Built index over {n:,} teachings in {time.perf_counter() - start:.1f}s")
+    for theme in (None, "mind"):
+        for query in queries:
+            index.search(query, theme=theme)  # first call fills the prefix-expansion cache
+            start = time.perf_counter()
+            for _ in range(repeat):
+                results = index.search(query, theme=theme, page=1)
+            elapsed = (time.perf_counter() - start) * 1000 / repeat
+            print(f"  {query!r:40} theme={theme!s:5} {results.total:7,} matches  {elapsed:6.2f} ms")
+
+
+def _check():
+    """Every stage of typing a word, past MIN_PREFIX_LENGTH, finds the teachings the whole word does."""
+    teachings = [
+        {"philosopher": "Lao Tzu", "theme": "stillness", "tradition": "Taoist",
+         "teaching": "Sit quietly, and the muddy water clears by itself."},
+        {"philosopher": "Rumi", "theme": "love", "tradition": "Sufi",
+         "teaching": "Loving is the bridge between you and everything."},
+        {"philosopher": "Rumi", "theme": "love", "tradition": "Sufi",
+         "teaching": "Love is the whole thing; we are only pieces."},
+        {"philosopher": "Eckhart", "theme": "stillness", "tradition": "Western",
+         "teaching": "Stillness is where creativity and solutions are found."},
+        {"philosopher": "Heraclitus", "theme": "freedom", "tradition": "Western",
+         "teaching": "No man ever steps in the same river twice."},
+    ]
+    index = SearchIndex(teachings)
+    expected = {"quietly": {0}, "loving": {1, 2}, "love": {1, 2}, "stillness": {3}, "rivers": {4}}
+    for word, found in expected.items():
+        for end in range(MIN_PREFIX_LENGTH, len(word) + 1):
+            hits = {teachings.index(t) for t in index.search(word[:end]).hits}
+            assert found <= hits, (word[:end], hits)
+    # A word followed by a space is finished, so it no longer matches as a prefix
+    assert not index.search("quietl ").hits
+    print(f"ok: {len(expected)} words, every prefix")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _check()
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,128 @@
+"""
+"More like this" for teachings: TF-IDF cosine similarity over the whole corpus.
+
+The corpus is turned once into a sparse, L2-normalised TF-IDF matrix held as
+NumPy arrays in compressed-column form (for each term: the teachings that
+use it and their float32 weights). Scoring a query is then a single
+bincount over the postings of the query's terms, and the top k come from
+argpartition, so lookups stay interactive at 100k teachings with no
+embedding service or network access.
+
+Run `python similarity.py [N]` to time lookups over N synthetic teachings.
+"""
+
+from collections import Counter
+
+import numpy as np
+
+from search_index import tokenize
+
+
+class SimilarityIndex:
+    """
+    Sparse TF-IDF matrix over a sequence of teachings (a list or a teaching
+    store), built in one pass; similar() fetches its results by position.
+    """
+
+    def __init__(self, teachings):
+        self._teachings = teachings
+        self._vocabulary = {}
+
+        rows, cols, counts = [], [], []
+        n = 0
+        for doc_id, teaching in enumerate(teachings):
+            n += 1
+            for term, count in Counter(tokenize(teaching["teaching"])).items():
+                rows.append(doc_id)
+                cols.append(self._vocabulary.setdefault(term, len(self._vocabulary)))
+                counts.append(count)
+
+        self._n = n
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int32)
+        doc_freq = np.bincount(cols, minlength=len(self._vocabulary))
+        self._idf = (np.log((1 + n) / (1 + doc_freq)) + 1).astype(np.float32)
+
+        weights = (1 + np.log(np.asarray(counts, dtype=np.float32))) * self._idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n)).astype(np.float32)
+        weights /= norms[rows]
+
+        # Compressed-column layout: postings of term t live in [term_ptr[t], term_ptr[t + 1])
+        order = np.argsort(cols, kind="stable")
+        self._doc_ids = rows[order]
+        self._weights = weights[order].astype(np.float32)
+        self._term_ptr = np.concatenate(([0], np.cumsum(doc_freq))).astype(np.int64)
+
+    def __len__(self):
+        return self._n
+
+    def _query_vector(self, text):
+        """Term ids and L2-normalised TF-IDF weights for a piece of text."""
+        counts = Counter(t for t in tokenize(text) if t in self._vocabulary)
+        if not counts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        terms = np.fromiter((self._vocabulary[t] for t in counts), dtype=np.int64, count=len(counts))
+        weights = (1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * self._idf[terms]
+        return terms, weights / np.linalg.norm(weights)
+
+    def scores(self, text):
+        """Cosine similarity of text against every teaching, as a float array."""
+        terms, query_weights = self._query_vector(text)
+        if not len(terms):
+            return np.zeros(self._n, dtype=np.float32)
+
+        starts = self._term_ptr[terms]
+        lengths = self._term_ptr[terms + 1] - starts
+        # Flat positions of every posting of every query term, without a Python loop
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(
+            self._doc_ids[positions],
+            weights=self._weights[positions] * np.repeat(query_weights, lengths),
+            minlength=self._n,
+        )
+
+    def similar(self, teaching, k=5):
+        """The k teachings most similar to the given one (which is itself excluded)."""
+        scores = self.scores(teaching["teaching"])
+        # One spare slot in case the teaching itself is in the corpus
+        k = min(k + 1, len(scores))
+        if k == 0:
+            return ()
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        hits = (self._teachings[i] for i in top.tolist() if scores[i] > 0)
+        return tuple(t for t in hits if t["teaching"] != teaching["teaching"])[:k - 1]
+
+
+def benchmark(n=100_000):
+    """Print build time, matrix size and lookup latency (median and p95 of 200 lookups) over n synthetic teachings."""
+    import itertools
+    import random
+    import time
+
+    rng = random.Random(0)
+    vocabulary = [f"word{i}" for i in range(8000)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    teachings = [
+        {"philosopher": "P", "theme": "mind", "tradition": "Western",
+         "teaching": " ".join(rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(15, 40)))}
+        for _ in range(n)
+    ]
+    start = time.perf_counter()
+    index = SimilarityIndex(teachings)
+    print(f"Built TF-IDF matrix over {n:,} teachings in {time.perf_counter() - start:.1f}s")
+    matrix_bytes = index._doc_ids.nbytes + index._weights.nbytes + index._term_ptr.nbytes
+    print(f"  matrix: {len(index._doc_ids):,} non-zeros, {matrix_bytes / 1024 / 1024:.1f} MB")
+    timings = []
+    for teaching in teachings[:200]:
+        start = time.perf_counter()
+        index.similar(teaching, k=5)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"  more-like-this: {timings[len(timings) // 2]:.2f} ms median, {timings[int(0.95 * len(timings))]:.2f} ms p95")
+
+
+if __name__ == "__main__":
+    import sys
+
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
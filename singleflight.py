@@ -0,0 +1,241 @@
+"""
+Request coalescing for identical LLM calls (singleflight).
+
+Calls are keyed by their canonical request, a hash of the model and the full
+Messages API parameters, together with a hash of the API key that pays for
+it. While a call is in flight, anyone making the same request on the same key
+waits for it and shares its result instead of sending their own, e.g. every
+session contemplating the new daily teaching in the same minute. Calls on
+different keys never share, so one key's auth or billing errors (and usage)
+stay with that key.
+Streaming calls are shared too: a follower replays the chunks the leader has
+received so far, then follows along live.
+
+Within a session, a finished call is also remembered for IDEMPOTENCY_SECONDS,
+so a double-click gets the first click's answer instead of a second request.
+Failed calls are never remembered. If a streaming leader stops reading
+part-way (its page was rerun), the stream is drained in the background for
+any followers; with none left it is closed.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from rate_limit import current_session
+
+IDEMPOTENCY_SECONDS = float(os.environ.get("LLM_IDEMPOTENCY_SECONDS", 5))
+
+
+class FlightAbandoned(RuntimeError):
+    """Raised to a follower when the call it was sharing stopped part-way."""
+
+
+def request_key(params, api_key):
+    """Hash of a canonical Messages API request (model, prompt, tools and limits) and the API key it is sent with."""
+    api_key = api_key or os.environ.get("ANTHROPIC_API_KEY") or ""
+    payload = json.dumps([hashlib.sha256(api_key.encode("utf-8")).hexdigest(), params],
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Flight:
+    """One call: the chunks it has streamed so far, and its outcome once done."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.followers = 0
+        self._cond = threading.Condition()
+
+    def publish(self, chunk):
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self, result=None, error=None):
+        with self._cond:
+            self.done = True
+            self.result = result
+            self.error = error
+            self.finished_at = time.monotonic()
+            self._cond.notify_all()
+
+    def wait(self):
+        """Block until the call finishes; return its result or raise its error."""
+        with self._cond:
+            while not self.done:
+                self._cond.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def replay(self):
+        """Yield every chunk, including those still to come, then raise the call's error if it failed."""
+        seen = 0
+        while True:
+            with self._cond:
+                while seen == len(self.chunks) and not self.done:
+                    self._cond.wait()
+                pending = self.chunks[seen:]
+                finished = self.done
+            seen += len(pending)
+            yield from pending
+            if finished:
+                break
+        if self.error is not None:
+            raise self.error
+
+
+class SingleFlight:
+    """Shares identical in-flight calls between callers, and recent results within a session."""
+
+    def __init__(self, window=IDEMPOTENCY_SECONDS):
+        self.window = window
+        self._flights = {}  # request key -> Flight in progress
+        self._recent = {}   # (session, request key) -> finished Flight
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "followers": 0, "repeats": 0, "takeovers": 0, "handoffs": 0}
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _join(self, key):
+        """(flight, leading): a remembered or running flight to share, or a new one for the caller to lead."""
+        session = current_session()
+        with self._lock:
+            now = time.monotonic()
+            for recent_key, flight in list(self._recent.items()):
+                if now - flight.finished_at > self.window:
+                    del self._recent[recent_key]
+            flight = self._recent.get((session, key)) if session is not None else None
+            if flight is not None:
+                self._stats["repeats"] += 1
+                return flight, False
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._stats["followers"] += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            self._stats["leaders"] += 1
+            return flight, True
+
+    def _remember(self, key, flight):
+        session = current_session()
+        if session is None or self.window <= 0:
+            return
+        with self._lock:
+            self._recent[(session, key)] = flight
+
+    def _land(self, key, flight, result=None, error=None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.finish(result, error)
+        if error is None:
+            self._remember(key, flight)
+
+    def do(self, key, fn):
+        """Return fn(), or the outcome of the identical call already in flight (or just made by this session)."""
+        while True:
+            flight, leading = self._join(key)
+            if leading:
+                break
+            try:
+                result = flight.wait()
+            except FlightAbandoned:
+                self._count("takeovers")
+                continue
+            self._remember(key, flight)
+            return result
+
+        try:
+            result = fn()
+        except Exception as exc:
+            self._land(key, flight, error=exc)
+            raise
+        except BaseException:
+            self._land(key, flight, error=FlightAbandoned("The shared request was stopped"))
+            raise
+        self._land(key, flight, result=result)
+        return result
+
+    def stream(self, key, fn):
+        """Yield the chunks of fn(), an iterator, sharing them with everyone making the identical call."""
+        while True:
+            flight, leading = self._join(key)
+            if leading:
+                break
+            given = False
+            with self._lock:
+                flight.followers += 1
+            try:
+                for chunk in flight.replay():
+                    given = True
+                    yield chunk
+            except FlightAbandoned:
+                if given:
+                    raise
+                self._count("takeovers")
+                continue
+            finally:
+                with self._lock:
+                    flight.followers -= 1
+            self._remember(key, flight)
+            return
+
+        chunks = fn()
+        try:
+            for chunk in chunks:
+                flight.publish(chunk)
+                yield chunk
+        except Exception as exc:
+            self._land(key, flight, error=exc)
+            raise
+        except BaseException:
+            # The leader's reader went away (GeneratorExit); finish the stream for anyone sharing it
+            with self._lock:
+                shared = flight.followers > 0
+            if shared:
+                self._count("handoffs")
+                threading.Thread(target=self._drain, args=(key, flight, chunks), daemon=True).start()
+            else:
+                self._land(key, flight, error=FlightAbandoned("The shared stream was stopped part-way"))
+                if hasattr(chunks, "close"):
+                    chunks.close()
+            raise
+        self._land(key, flight)
+
+    def _drain(self, key, flight, chunks):
+        try:
+            for chunk in chunks:
+                flight.publish(chunk)
+        except Exception as exc:
+            self._land(key, flight, error=exc)
+        else:
+            self._land(key, flight)
+
+    def stats(self):
+        """Counters: leaders, followers, repeats, takeovers, handoffs, plus in_flight."""
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._flights))
+
+
+_flights = None
+_flights_lock = threading.Lock()
+
+
+def get_flights():
+    """Return the process-wide singleflight group."""
+    global _flights
+    if _flights is None:
+        with _flights_lock:
+            if _flights is None:
+                _flights = SingleFlight()
+    return _flights
@@ -0,0 +1,194 @@
+"""
+Structured output for the LLM call sites: tool schemas, extraction and repair.
+
+Both generate_teaching_from_llm() and The Observer force a single tool call,
+so Claude answers with schema-shaped tool input instead of JSON embedded in
+prose. If a reply still arrives as text (or is cut off at max_tokens),
+repair_json() recovers what it can in one pass: it skips any leading prose or
+code fence, closes an unterminated string and any open brackets, and
+otherwise falls back to the last complete value. A forced tool call cut off
+at max_tokens gets the same treatment (see tool_input), rather than being
+passed on as if complete. The validators then keep only well-formed records,
+so most bad replies no longer cost a retry.
+"""
+
+import copy
+import json
+
+TEACHING_FIELDS = ("philosopher", "theme", "tradition", "teaching")
+OBSERVATION_FIELDS = ("observer", "observed", "unity", "reflection", "mirror")
+
+TEACHINGS_TOOL_NAME = "record_teachings"
+OBSERVATION_TOOL_NAME = "record_observation"
+
+OBSERVATION_TOOL = {
+    "name": OBSERVATION_TOOL_NAME,
+    "description": "Record the observer/observed analysis of the user's statement.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "observer": {"type": "string", "description": "brief description of the observer voice"},
+            "observed": {"type": "string", "description": "what is being observed"},
+            "unity": {"type": "string", "description": "2-3 sentences showing they are the same movement"},
+            "reflection": {"type": "string", "description": "2-3 sentence gentle reflection"},
+            "mirror": {"type": "string", "description": "one open question for direct seeing"},
+        },
+        "required": list(OBSERVATION_FIELDS),
+    },
+}
+
+
+def teachings_tool(count, themes, traditions):
+    """Tool definition for count teachings, with theme and tradition limited to the known values."""
+    return {
+        "name": TEACHINGS_TOOL_NAME,
+        "description": "Record the generated philosophical teachings.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "teachings": {
+                    "type": "array",
+                    "minItems": count,
+                    "maxItems": count,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "philosopher": {"type": "string"},
+                            "theme": {"type": "string", "enum": list(themes)},
+                            "tradition": {"type": "string", "enum": list(traditions)},
+                            "teaching": {"type": "string"},
+                        },
+                        "required": list(TEACHING_FIELDS),
+                    },
+                },
+            },
+            "required": ["teachings"],
+        },
+    }
+
+
+def tool_choice(name):
+    return {"type": "tool", "name": name}
+
+
+def tool_input(message, name, partial_strings=True):
+    """
+    The input of the named tool call in a message, or the repaired JSON of its text (see repair_json).
+
+    When the message stopped at max_tokens, the tool input is only what was
+    written before the cut, and its last value may end mid-way: with
+    partial_strings it is kept, otherwise it is dropped (so a record missing
+    it fails validation), as repair_json does for text.
+    """
+    for block in message.content:
+        if block.type == "tool_use" and block.name == name:
+            if message.stop_reason == "max_tokens" and not partial_strings:
+                # A copy, since one response may be shared by several callers
+                return _drop_last_value(copy.deepcopy(block.input))
+            return block.input
+    text = "".join(block.text for block in message.content if block.type == "text")
+    return repair_json(text, partial_strings=partial_strings)
+
+
+def _drop_last_value(data):
+    """data, a parsed document that may be cut off at its end, without its last scalar value."""
+    container = data
+    while isinstance(container, (dict, list)) and container:
+        key = next(reversed(container)) if isinstance(container, dict) else len(container) - 1
+        if isinstance(container[key], (dict, list)) and container[key]:
+            container = container[key]
+        else:
+            del container[key]
+            break
+    return data
+
+
+def repair_json(text, partial_strings=True):
+    """
+    Parse the first JSON object or array in text, tolerating truncation.
+
+    With partial_strings, a string cut off mid-way is closed and kept;
+    otherwise the document is cut back to the last complete value.
+    Raises ValueError when nothing usable is found.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("No JSON found in response")
+    start = min(starts)
+
+    closers = []
+    cut_points = []  # (end index, closers) where text[start:end] + closers is complete
+    in_string = escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+            cut_points.append((i + 1, "".join(reversed(closers))))
+        elif ch in "}]":
+            if not closers or closers[-1] != ch:
+                break
+            closers.pop()
+            if not closers:
+                return json.loads(text[start:i + 1])
+            cut_points.append((i + 1, "".join(reversed(closers))))
+        elif ch == ",":
+            cut_points.append((i, "".join(reversed(closers))))
+
+    candidates = []
+    if in_string and partial_strings:
+        body = text[start:]
+        if escape:
+            body = body[:-1]
+        candidates.append(body + '"' + "".join(reversed(closers)))
+    candidates.extend(text[start:end] + tail for end, tail in reversed(cut_points))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    raise ValueError("Could not repair JSON in response")
+
+
+def validate_teachings(items, themes, traditions):
+    """
+    Keep well-formed teachings, mapping theme (key or label) and tradition
+    case-insensitively onto the known values. themes is the THEMES mapping.
+    """
+    if isinstance(items, dict):
+        items = items.get("teachings", [])
+    theme_lookup = {}
+    for key, info in themes.items():
+        if key != "all":
+            theme_lookup[key.lower()] = key
+            theme_lookup[info["label"].lower()] = key
+    tradition_lookup = {t.lower(): t for t in traditions}
+
+    valid = []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict) or not all(isinstance(item.get(f), str) and item[f].strip() for f in TEACHING_FIELDS):
+            continue
+        theme = theme_lookup.get(item["theme"].strip().lower())
+        tradition = tradition_lookup.get(item["tradition"].strip().lower())
+        if theme and tradition:
+            valid.append({"philosopher": item["philosopher"].strip(), "theme": theme,
+                          "tradition": tradition, "teaching": item["teaching"].strip()})
+    return valid
+
+
+def validate_observation(data):
+    """The five Observer fields as stripped strings; raises ValueError if any is missing."""
+    if not isinstance(data, dict):
+        raise ValueError("Analysis is not a JSON object")
+    missing = [f for f in OBSERVATION_FIELDS if not isinstance(data.get(f), str) or not data[f].strip()]
+    if missing:
+        raise ValueError(f"Incomplete analysis (missing {', '.join(missing)})")
+    return {f: data[f].strip() for f in OBSERVATION_FIELDS}
@@ -0,0 +1,170 @@
+"""
+Concurrent fan-out for generating several teachings at once.
+
+generate_teaching_from_llm(count=N) asks for all N teachings in one long
+completion, so its latency grows with N and one malformed item fails them
+all. agenerate_teachings() instead sends N single-teaching requests at once on
+an AsyncAnthropic client (at most TEACHING_FANOUT_CONCURRENCY in flight) and
+yields each teaching as soon as its reply is validated and found to be new.
+A request that fails or returns nothing usable is logged and skipped; only if
+none succeed is an error raised.
+
+iter_teachings() and generate_teachings() wrap it for synchronous callers
+(the Streamlit pages, the teaching pool). They run it on a private event loop
+in a worker thread.
+
+Run `python teaching_fanout.py --count 4 --theme stillness` to try it.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import logging
+import os
+import queue
+import threading
+
+from dotenv import load_dotenv
+
+from call_policy import get_policy, is_unavailable
+from llm_client import make_async_client
+from model_router import routed_acreate
+from rate_limit import estimate_tokens
+from structured_output import TEACHINGS_TOOL_NAME, tool_input, validate_teachings
+from teachings import THEMES, curated_fallback, get_traditions, keep_fresh, teaching_request_params
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+FANOUT_CONCURRENCY = int(os.environ.get("TEACHING_FANOUT_CONCURRENCY", 4))
+
+_DONE = object()
+
+
+async def _one(client, semaphore, params, traditions):
+    async with semaphore:
+        message = await get_policy("teaching").acall(
+            lambda timeout: routed_acreate("teaching", client, params, timeout),
+            tokens=estimate_tokens(params),
+        )
+    teachings = validate_teachings(tool_input(message, TEACHINGS_TOOL_NAME, partial_strings=False), THEMES, traditions)
+    if not teachings:
+        raise ValueError("No valid teaching in the response")
+    return teachings[0]
+
+
+async def agenerate_teachings(philosopher=None, theme=None, tradition=None, api_key=None, count=1,
+                              concurrency=FANOUT_CONCURRENCY, dedupe=True, fallback=False):
+    """
+    Async iterator over up to count new teachings, in the order they complete.
+
+    Duplicates (see teachings.keep_fresh) are skipped when dedupe is set, so
+    fewer than count may be yielded. Raises RuntimeError if nothing at all
+    could be generated, unless fallback is set and the API was unavailable,
+    in which case one matching curated teaching is yielded instead.
+    """
+    api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise ValueError("API key required. Set ANTHROPIC_API_KEY or pass api_key parameter.")
+
+    traditions = get_traditions()
+    client = make_async_client(api_key, max_retries=0)
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.ensure_future(_one(client, semaphore, teaching_request_params(
+            philosopher, theme, tradition, variation=f"{i + 1} of {count}" if count > 1 else None), traditions))
+        for i in range(count)
+    ]
+    yielded = 0
+    error = None
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                teaching = await next_done
+            except Exception as exc:
+                logger.warning("One of %d teaching requests failed: %s", count, exc)
+                error = exc
+                continue
+            if dedupe and not keep_fresh([teaching])[0]:
+                continue
+            yielded += 1
+            yield teaching
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await client.close()
+
+    if yielded or error is None:
+        return
+    curated = curated_fallback(philosopher, theme, tradition) if fallback and is_unavailable(error) else None
+    if curated is None:
+        raise RuntimeError(f"Error generating teachings: {error}") from error
+    yield curated
+
+
+def iter_teachings(**kwargs):
+    """
+    Iterate agenerate_teachings(**kwargs) from synchronous code.
+
+    It runs on its own event loop in a worker thread (with the caller's
+    context, so rate-limit sessions carry over). Teachings are handed over as
+    they arrive. Stopping early cancels the requests still outstanding.
+    """
+    items = queue.Queue()
+    running = {}
+
+    async def pump():
+        running["loop"], running["task"] = asyncio.get_running_loop(), asyncio.current_task()
+        try:
+            async for teaching in agenerate_teachings(**kwargs):
+                items.put(teaching)
+        except asyncio.CancelledError:
+            pass
+        except Exception as exc:
+            items.put(exc)
+        else:
+            items.put(_DONE)
+
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(asyncio.run, pump()), name="teaching-fanout", daemon=True).start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        if "task" in running:
+            try:
+                running["loop"].call_soon_threadsafe(running["task"].cancel)
+            except RuntimeError:
+                pass  # Already finished
+
+
+def generate_teachings(philosopher=None, theme=None, tradition=None, api_key=None, count=1, **kwargs):
+    """All the teachings from agenerate_teachings() as a list, for synchronous callers."""
+    return list(iter_teachings(philosopher=philosopher, theme=theme, tradition=tradition,
+                               api_key=api_key, count=count, **kwargs))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate several teachings concurrently.")
+    parser.add_argument("--count", type=int, default=4)
+    parser.add_argument("--philosopher")
+    parser.add_argument("--theme", choices=[k for k in THEMES if k != "all"])
+    parser.add_argument("--tradition")
+    parser.add_argument("--concurrency", type=int, default=FANOUT_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    for teaching in iter_teachings(philosopher=args.philosopher, theme=args.theme, tradition=args.tradition,
+                                   count=args.count, concurrency=args.concurrency):
+        print(f"{teaching['philosopher']} ({teaching['tradition']}, {teaching['theme']}): {teaching['teaching']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+"""
+Pre-generated teachings for the Generate tab, pooled per selector combination.
+
+Each (philosopher, theme, tradition) combination someone asks for gets its
+own small pool. A click pops from the pool instantly. When a pool drops below
+LOW_WATER, a background worker tops it up with REFILL_COUNT teachings, fanned
+out as concurrent single-teaching requests (see teaching_fanout).
+Combinations nobody has used for DECAY_SECONDS are dropped, along with
+their teachings.
+
+The pool is shared by every session, so refills are paid for by the server's
+own key (TEACHING_POOL_API_KEY, else ANTHROPIC_API_KEY), never by the visitor
+whose click happened to drain it. Without a server key the pool is not
+refilled, and the Generate tab falls back to live calls on the visitor's key.
+
+The pool is persisted as an append-only JSONL log of add/take/drop events,
+which is replayed on start and compacted once it is mostly dead lines.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from teaching_fanout import generate_teachings
+
+logger = logging.getLogger(__name__)
+
+POOL_LOG = os.environ.get(
+    "TEACHING_POOL_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "teaching_pool.jsonl"),
+)
+LOW_WATER = int(os.environ.get("TEACHING_POOL_LOW_WATER", 2))
+REFILL_COUNT = int(os.environ.get("TEACHING_POOL_REFILL_COUNT", 4))
+DECAY_SECONDS = int(os.environ.get("TEACHING_POOL_DECAY", 3 * 24 * 3600))
+REFILL_API_KEY = os.environ.get("TEACHING_POOL_API_KEY") or os.environ.get("ANTHROPIC_API_KEY")
+
+
+def pool_key(philosopher=None, theme=None, tradition=None):
+    """Pool key for a selector combination; "Any"/"all" and None all mean unconstrained."""
+    return tuple(None if v in (None, "Any", "all") else v for v in (philosopher, theme, tradition))
+
+
+class TeachingPool:
+    """Per-combination pools of generated teachings, backed by an append-only log."""
+
+    def __init__(self, log_path=POOL_LOG, low_water=LOW_WATER, refill_count=REFILL_COUNT,
+                 decay_seconds=DECAY_SECONDS, api_key=REFILL_API_KEY):
+        self.log_path = log_path
+        self.api_key = api_key
+        self.low_water = low_water
+        self.refill_count = refill_count
+        self.decay_seconds = decay_seconds
+        self._pools = {}       # key -> {entry id: teaching}, in insertion order
+        self._last_used = {}   # key -> timestamp of the last take
+        self._log_lines = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._worker = None
+        self._replay()
+
+    def _replay(self):
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                self._log_lines += 1
+                event = json.loads(line)
+                self._apply(event)
+
+    def _apply(self, event):
+        key = tuple(event["key"])
+        op = event["op"]
+        if op == "add":
+            self._pools.setdefault(key, {})[event["id"]] = event["teaching"]
+            self._last_used.setdefault(key, event["at"])
+        elif op == "take":
+            self._pools.get(key, {}).pop(event["id"], None)
+            self._last_used[key] = event["at"]
+        elif op == "drop":
+            self._pools.pop(key, None)
+            self._last_used.pop(key, None)
+
+    def _record(self, event):
+        """Apply an event and append it to the log. Caller holds the lock."""
+        self._apply(event)
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._log_lines += 1
+
+    def _compact(self):
+        """Rewrite the log with only live entries once most of it is dead. Caller holds the lock."""
+        live = sum(len(pool) for pool in self._pools.values())
+        if self._log_lines < 64 or self._log_lines < 4 * live:
+            return
+        tmp_path = f"{self.log_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, pool in self._pools.items():
+                for entry_id, teaching in pool.items():
+                    event = {"op": "add", "key": list(key), "id": entry_id, "teaching": teaching,
+                             "at": self._last_used[key]}
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.log_path)
+        self._log_lines = live
+
+    def _decay(self, now):
+        """Drop combinations nobody has taken from lately. Caller holds the lock."""
+        for key, last_used in list(self._last_used.items()):
+            if now - last_used > self.decay_seconds and key not in self._pending:
+                self._record({"op": "drop", "key": list(key), "at": now})
+
+    def size(self, key):
+        """Number of teachings waiting in a combination's pool."""
+        with self._lock:
+            return len(self._pools.get(key, ()))
+
+    def add(self, key, teachings):
+        """Add generated teachings to a combination's pool."""
+        now = time.time()
+        with self._lock:
+            for teaching in teachings:
+                self._record({"op": "add", "key": list(key), "id": uuid.uuid4().hex, "teaching": teaching, "at": now})
+
+    def take(self, key):
+        """
+        Pop the oldest teaching for a combination, or None if its pool is empty.
+
+        Either way the combination counts as used, and a refill is queued when
+        the pool is below the low-water mark and the pool has a key to refill with.
+        """
+        now = time.time()
+        with self._lock:
+            pool = self._pools.get(key, {})
+            teaching = None
+            if pool:
+                entry_id = next(iter(pool))
+                teaching = pool[entry_id]
+                self._record({"op": "take", "key": list(key), "id": entry_id, "at": now})
+            else:
+                self._last_used[key] = now
+            remaining = len(self._pools.get(key, ()))
+            self._decay(now)
+            self._compact()
+        if self.api_key and remaining < self.low_water:
+            self.request_refill(key)
+        return teaching
+
+    def request_refill(self, key):
+        """Queue a background top-up for a combination (at most one pending per combination)."""
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="teaching-pool-refill", daemon=True)
+                self._worker.start()
+        self._queue.put(key)
+
+    def refill(self, key):
+        """Generate a batch for a combination synchronously with the pool's key. Returns how many were added."""
+        philosopher, theme, tradition = key
+        teachings = generate_teachings(
+            philosopher=philosopher, theme=theme, tradition=tradition,
+            api_key=self.api_key, count=self.refill_count,
+        )
+        self.add(key, teachings)
+        return len(teachings)
+
+    def _run(self):
+        while True:
+            key = self._queue.get()
+            try:
+                if self.size(key) < self.low_water:
+                    self.refill(key)
+            except Exception:
+                logger.exception("Teaching pool refill failed for %s", key)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide teaching pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = TeachingPool()
+    return _pool
+
+
+def take_pooled_teaching(philosopher=None, theme=None, tradition=None):
+    """A pre-generated teaching for the selectors, or None; queues a refill when the pool runs low."""
+    return get_pool().take(pool_key(philosopher, theme, tradition))
@@ -0,0 +1,99 @@
+"""
+Indexed, read-only view over a teachings corpus.
+
+The store builds theme/philosopher/tradition inverted indexes and facet counts
+once, so filtering is a dictionary lookup instead of a scan over the whole
+corpus. Everything it hands out is immutable (tuples and mapping proxies),
+which makes one store safe to share across every session in the process.
+"""
+
+import random
+from collections import defaultdict
+from types import MappingProxyType
+
+FIELDS = ("theme", "philosopher", "tradition")
+
+
+def daily_index(day, count):
+    """Position of the day's pick among count teachings; stable for a given date."""
+    return day.timetuple().tm_yday % count
+
+
+class TeachingStore:
+    """Teachings plus inverted indexes on theme, philosopher and tradition."""
+
+    def __init__(self, teachings):
+        self._teachings = tuple(teachings)
+
+        postings = {field: defaultdict(list) for field in FIELDS}
+        for teaching in self._teachings:
+            for field in FIELDS:
+                postings[field][teaching[field]].append(teaching)
+
+        self._index = {
+            field: MappingProxyType({value: tuple(items) for value, items in postings[field].items()})
+            for field in FIELDS
+        }
+        self._facets = {
+            field: MappingProxyType({value: len(items) for value, items in postings[field].items()})
+            for field in FIELDS
+        }
+        self.philosophers = tuple(sorted(self._index["philosopher"]))
+        self.traditions = tuple(sorted(self._index["tradition"]))
+        self.themes = tuple(sorted(self._index["theme"]))
+        # Memoised results for multi-field filters; bounded by the distinct combinations in the data
+        self._combinations = {}
+
+    def __len__(self):
+        return len(self._teachings)
+
+    def __iter__(self):
+        return iter(self._teachings)
+
+    def __getitem__(self, index):
+        return self._teachings[index]
+
+    @property
+    def teachings(self):
+        return self._teachings
+
+    def facet_counts(self, field):
+        """Read-only {value: count} for theme, philosopher or tradition."""
+        return self._facets[field]
+
+    def lookup(self, field, value):
+        """All teachings whose field equals value, as a tuple."""
+        return self._index[field].get(value, ())
+
+    def filter(self, theme=None, philosopher=None, tradition=None):
+        """Teachings matching every given criterion ("all" means any theme)."""
+        if theme == "all":
+            theme = None
+        criteria = [(f, v) for f, v in zip(FIELDS, (theme, philosopher, tradition)) if v]
+        if not criteria:
+            return self._teachings
+        if len(criteria) == 1:
+            return self.lookup(*criteria[0])
+
+        key = (theme, philosopher, tradition)
+        result = self._combinations.get(key)
+        if result is None:
+            # Walk the smallest posting list and check the rest of the fields on it
+            candidates = min((self.lookup(f, v) for f, v in criteria), key=len)
+            result = tuple(t for t in candidates if all(t[f] == v for f, v in criteria))
+            self._combinations[key] = result
+        return result
+
+    def count(self, theme=None, philosopher=None, tradition=None):
+        """Number of teachings matching the criteria."""
+        return len(self.filter(theme, philosopher, tradition))
+
+    def random(self, theme=None, philosopher=None, tradition=None):
+        """A random matching teaching, or None if nothing matches."""
+        matches = self.filter(theme, philosopher, tradition)
+        return random.choice(matches) if matches else None
+
+    def daily(self, day, theme=None, philosopher=None, tradition=None):
+        """The matching teaching for a given date, or None if nothing matches."""
+        matches = self.filter(theme, philosopher, tradition)
+        return matches[daily_index(day, len(matches))] if matches else None
@@ -0,0 +1,287 @@
+"""
+SQLite-backed teachings corpus with an FTS5 index over the teaching text.
+
+The database is built from the curated corpus (see ensure_database and
+migrate), rebuilt whenever curated_teachings.py changes, and then opened
+read-only, in WAL mode, with one
+connection per thread. Filtering, counting, daily and random picks all run as
+indexed queries, so the cost of a Streamlit rerun no longer grows with the
+size of the corpus.
+
+SqliteTeachingStore offers the same interface as TeachingStore, so
+teachings.get_teaching_store() can hand out either. Its search() has the
+same signature as SearchIndex.search and runs on the FTS5 table.
+
+Usage:
+    python teachings_db.py migrate [path]     # one-shot build (default teachings.db)
+    TEACHINGS_BACKEND=sqlite streamlit run Home.py
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+from array import array
+from functools import lru_cache
+
+from search_index import SearchResults
+from teaching_store import FIELDS, daily_index
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "teachings.db")
+CURATED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "curated_teachings.py")
+
+SCHEMA = """
+CREATE TABLE teachings (
+    id          INTEGER PRIMARY KEY,
+    philosopher TEXT NOT NULL,
+    theme       TEXT NOT NULL,
+    tradition   TEXT NOT NULL,
+    teaching    TEXT NOT NULL
+);
+CREATE INDEX idx_teachings_theme ON teachings (theme, id);
+CREATE INDEX idx_teachings_philosopher ON teachings (philosopher, id);
+CREATE INDEX idx_teachings_tradition ON teachings (tradition, id);
+CREATE VIRTUAL TABLE teachings_fts USING fts5 (
+    teaching, philosopher,
+    content='teachings', content_rowid='id',
+    tokenize='porter unicode61'
+);
+CREATE TABLE meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+COLUMNS = "philosopher, theme, tradition, teaching"
+# Cached id lists for filtered daily/random picks, one per criteria combination
+ID_LIST_CACHE_SIZE = 64
+
+
+def corpus_hash(teachings):
+    """Content hash of a corpus, in order; migrate() rebuilds when it changes."""
+    digest = hashlib.sha256()
+    for t in teachings:
+        digest.update(json.dumps([t["philosopher"], t["theme"], t["tradition"], t["teaching"]],
+                                 ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def source_hash(path=CURATED_PATH):
+    """Hash of the curated corpus's source file, so a database can be checked without loading the corpus."""
+    with open(path, "rb") as f:
+        return "source:" + hashlib.sha256(f.read()).hexdigest()
+
+
+def _stored_hash(db_path):
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'corpus_hash'").fetchone()
+    except sqlite3.Error:
+        return None  # Built before the meta table existed
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def migrate(teachings, db_path=DEFAULT_DB_PATH, force=False, content_hash=None):
+    """
+    Build the database from a list of teaching dicts. Returns the row count.
+
+    Rows keep the list's order (id = position + 1), so daily picks match the
+    in-memory store. An existing database built from the same corpus (by
+    content_hash, corpus_hash(teachings) by default) is left alone (returning
+    None) unless force is set.
+
+    The database is written to a temporary file of its own in the same
+    directory and moved into place atomically, so processes migrating at the
+    same time never write to the same file, and readers only ever see a
+    complete database.
+    """
+    if content_hash is None:
+        content_hash = corpus_hash(teachings)
+    if os.path.exists(db_path) and not force and _stored_hash(db_path) == content_hash:
+        return None
+
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(db_path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(os.path.abspath(db_path)))
+    os.close(fd)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            f"INSERT INTO teachings (id, {COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+            ((i + 1, t["philosopher"], t["theme"], t["tradition"], t["teaching"]) for i, t in enumerate(teachings)),
+        )
+        conn.execute("INSERT INTO teachings_fts (teachings_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('corpus_hash', ?)", (content_hash,))
+        conn.commit()
+        conn.execute("ANALYZE")
+        # WAL is persistent, so read-only connections opened later inherit it
+        conn.execute("PRAGMA journal_mode=WAL")
+        count = conn.execute("SELECT COUNT(*) FROM teachings").fetchone()[0]
+        conn.close()
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    return count
+
+
+def ensure_database(db_path=DEFAULT_DB_PATH, force=False):
+    """
+    Build the database from curated_teachings if it is missing or older than
+    that file (or force is set). Returns the row count, or None if it was
+    already current; the corpus is only loaded when it has to be rebuilt.
+    """
+    content_hash = source_hash()
+    if os.path.exists(db_path) and not force and _stored_hash(db_path) == content_hash:
+        return None
+    from curated_teachings import load_teachings
+
+    return migrate(load_teachings(), db_path, force=True, content_hash=content_hash)
+
+
+def _row_to_dict(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+def _where(theme=None, philosopher=None, tradition=None):
+    """WHERE clause and parameters for the given criteria ("all" means any theme)."""
+    if theme == "all":
+        theme = None
+    criteria = [(f, v) for f, v in zip(FIELDS, (theme, philosopher, tradition)) if v]
+    if not criteria:
+        return "", ()
+    return " WHERE " + " AND ".join(f"{f} = ?" for f, _ in criteria), tuple(v for _, v in criteria)
+
+
+def _match_expression(query):
+    """
+    An FTS5 MATCH expression for a search box query: any of its words, each
+    quoted so user input cannot inject FTS syntax; the last word (or any word
+    ending in "*") also matches as a prefix, as in SearchIndex.
+    """
+    words = re.findall(r"\w+\*?", query.lower())
+    trailing_prefix = not query.endswith(" ")
+    terms = []
+    for i, word in enumerate(words):
+        prefix = word.endswith("*") or (trailing_prefix and i == len(words) - 1)
+        terms.append(f'"{word.rstrip("*")}"' + ("*" if prefix else ""))
+    return " OR ".join(terms)
+
+
+class SqliteTeachingStore:
+    """Read-only teachings corpus served from SQLite."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self.philosophers = self._distinct("philosopher")
+        self.traditions = self._distinct("tradition")
+        self.themes = self._distinct("theme")
+        self._count = lru_cache(maxsize=1024)(self._count_uncached)
+        self._ids = lru_cache(maxsize=ID_LIST_CACHE_SIZE)(self._ids_uncached)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            conn.row_factory = _row_to_dict
+            self._local.conn = conn
+        return conn
+
+    def _distinct(self, field):
+        rows = self._conn().execute(f"SELECT DISTINCT {field} AS value FROM teachings ORDER BY 1")
+        return tuple(r["value"] for r in rows)
+
+    def _count_uncached(self, theme, philosopher, tradition):
+        where, params = _where(theme, philosopher, tradition)
+        return self._conn().execute(f"SELECT COUNT(*) AS n FROM teachings{where}", params).fetchone()["n"]
+
+    def _ids_uncached(self, theme, philosopher, tradition):
+        where, params = _where(theme, philosopher, tradition)
+        rows = self._conn().execute(f"SELECT id FROM teachings{where} ORDER BY id", params)
+        return array("q", (r["id"] for r in rows))
+
+    def _at(self, offset, theme, philosopher, tradition):
+        """The offset-th matching teaching in id order, fetched by primary key."""
+        if _where(theme, philosopher, tradition)[1]:
+            row_id = self._ids(theme, philosopher, tradition)[offset]
+        else:
+            row_id = offset + 1  # migrate() numbers the rows 1..n
+        return self._conn().execute(f"SELECT {COLUMNS} FROM teachings WHERE id = ?", (row_id,)).fetchone()
+
+    def __len__(self):
+        return self._count(None, None, None)
+
+    def __iter__(self):
+        # Rows stream off the cursor, so a full pass (building an index) never holds the whole corpus
+        return iter(self._conn().execute(f"SELECT {COLUMNS} FROM teachings ORDER BY id"))
+
+    def __getitem__(self, index):
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("teaching index out of range")
+        return self._at(index, None, None, None)
+
+    def facet_counts(self, field):
+        """{value: count} for theme, philosopher or tradition."""
+        if field not in FIELDS:
+            raise KeyError(field)
+        rows = self._conn().execute(f"SELECT {field} AS value, COUNT(*) AS n FROM teachings GROUP BY {field}")
+        return {r["value"]: r["n"] for r in rows}
+
+    def filter(self, theme=None, philosopher=None, tradition=None):
+        """Teachings matching every given criterion, as a tuple of dicts."""
+        where, params = _where(theme, philosopher, tradition)
+        return tuple(self._conn().execute(f"SELECT {COLUMNS} FROM teachings{where} ORDER BY id", params))
+
+    def count(self, theme=None, philosopher=None, tradition=None):
+        """Number of teachings matching the criteria."""
+        return self._count(theme, philosopher, tradition)
+
+    def random(self, theme=None, philosopher=None, tradition=None):
+        """A random matching teaching, or None if nothing matches."""
+        count = self.count(theme, philosopher, tradition)
+        return self._at(random.randrange(count), theme, philosopher, tradition) if count else None
+
+    def daily(self, day, theme=None, philosopher=None, tradition=None):
+        """The matching teaching for a given date, or None if nothing matches."""
+        count = self.count(theme, philosopher, tradition)
+        return self._at(daily_index(day, count), theme, philosopher, tradition) if count else None
+
+    def search(self, query, theme=None, page=0, per_page=10):
+        """Ranked, paginated FTS5 matches for query, optionally within one theme (as SearchIndex.search)."""
+        expression = _match_expression(query)
+        if not expression:
+            return SearchResults(total=0, page=page, per_page=per_page, hits=())
+        theme_clause, params = ("", ()) if theme in (None, "all") else (" AND t.theme = ?", (theme,))
+        source = ("FROM teachings_fts JOIN teachings t ON t.id = teachings_fts.rowid "
+                  f"WHERE teachings_fts MATCH ?{theme_clause}")
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) AS n {source}", (expression,) + params).fetchone()["n"]
+        hits = tuple(conn.execute(
+            f"SELECT {', '.join('t.' + c.strip() for c in COLUMNS.split(','))} {source} "
+            "ORDER BY bm25(teachings_fts) LIMIT ? OFFSET ?",
+            (expression,) + params + (per_page, page * per_page),
+        ))
+        return SearchResults(total=total, page=page, per_page=per_page, hits=hits)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        sys.exit(__doc__)
+    path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DB_PATH
+    count = ensure_database(path, force=True)
+    print(f"Wrote {count} teachings to {path}")